@@ -0,0 +1,100 @@
+"""Compare list-endpoint serialization paths.
+
+"pydantic" reproduces the previous handlers: one PaperResponse per row, then
+FastAPI validating the list again against response_model and encoding it.
+"orjson" is the rows_response path used by the list endpoints now: orjson
+encodes the rows and one TypeAdapter validates and re-serializes the list.
+
+Run from the backend directory (no database needed):
+
+    python -m benchmarks.bench_serialization [--rows 2000] [--repeat 20]
+"""
+import argparse
+import json
+import time
+import uuid
+from collections import namedtuple
+from datetime import date, datetime, timezone
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from models.schemas import PaperResponse
+from utils.serialization import rows_response
+
+PaperRow = namedtuple(
+    "PaperRow",
+    ["id", "title", "authors", "abstract", "publication_date", "pdf_url", "arxiv_id", "doi", "created_at"]
+)
+PaperRow._mapping = property(lambda self: self._asdict())
+
+
+def make_rows(count):
+    now = datetime.now(timezone.utc)
+    return [
+        PaperRow(
+            id=uuid.uuid4(),
+            title=f"Paper {i}: a study of something reasonably long",
+            authors=["Ada Lovelace", "Alan Turing", "Grace Hopper"],
+            abstract="Lorem ipsum dolor sit amet, " * 20,
+            publication_date=date(2024, 1, 1),
+            pdf_url=f"https://arxiv.org/pdf/2401.{i:05d}v1.pdf",
+            arxiv_id=f"2401.{i:05d}v1",
+            doi=None,
+            created_at=now
+        )
+        for i in range(count)
+    ]
+
+
+def pydantic_path(rows):
+    papers = [
+        PaperResponse(
+            id=str(row.id),
+            title=row.title,
+            authors=row.authors,
+            abstract=row.abstract,
+            publication_date=row.publication_date,
+            pdf_url=row.pdf_url,
+            arxiv_id=row.arxiv_id,
+            doi=row.doi,
+            created_at=row.created_at
+        )
+        for row in rows
+    ]
+    validated = TypeAdapter(List[PaperResponse]).validate_python(
+        [paper.model_dump() for paper in papers]
+    )
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def orjson_path(rows):
+    return rows_response(rows, PaperResponse).body
+
+
+def timeit(fn, rows, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark list endpoint serialization")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    assert json.loads(pydantic_path(rows)) == json.loads(orjson_path(rows))
+
+    baseline = timeit(pydantic_path, rows, args.repeat)
+    fast = timeit(orjson_path, rows, args.repeat)
+    print(f"rows={args.rows}")
+    print(f"pydantic: {baseline * 1000:.2f} ms")
+    print(f"orjson:   {fast * 1000:.2f} ms ({baseline / fast:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Compare vector search modes: full-precision, halfvec and binary-quantized.
+
+Queries are embeddings of randomly sampled stored papers. Ground truth is an
+exact scan with index scans disabled; each mode is then run through
+nearest_papers_sql exactly as the API runs it, and reported with recall@k,
+mean/p95 latency and the on-disk size of the index it uses.
+
+Run from the backend directory against a populated database (pgvector 0.7+
+with the compact-index migration applied for the half/binary modes):
+
+    python -m benchmarks.bench_vector_search [--queries 100] [--k 10]
+
+The shortlist size follows VECTOR_SHORTLIST_FACTOR, as in the API.
+"""
+import argparse
+import statistics
+import time
+from sqlalchemy import text
+from config import get_settings
+from database import engine
+from utils.vector_search import nearest_papers_sql, prepare_vector_search
+
+settings = get_settings()
+
+MODE_INDEXES = {
+    "full": "papers_embedding_idx",
+    "half": "papers_embedding_half_idx",
+    "binary": "papers_embedding_bit_idx"
+}
+
+
+def sample_queries(conn, count):
+    rows = conn.execute(
+        text("""
+            SELECT id, CAST(embedding AS text) AS embedding
+            FROM papers
+            WHERE embedding IS NOT NULL AND embedding_model = :embedding_model
+            ORDER BY random()
+            LIMIT :count
+        """),
+        {"embedding_model": settings.embedding_model_name, "count": count}
+    ).fetchall()
+    return [(str(row.id), row.embedding) for row in rows]
+
+
+def run_query(conn, sql, embedding, paper_id, params):
+    return [
+        str(row.id)
+        for row in conn.execute(text(sql), {**params, "embedding": embedding, "paper_id": paper_id})
+    ]
+
+
+def index_size(conn, name):
+    return conn.execute(
+        text("SELECT pg_relation_size(to_regclass(:name))"),
+        {"name": name}
+    ).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector search modes")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    params = {
+        "embedding_model": settings.embedding_model_name,
+        "shortlist_factor": settings.vector_shortlist_factor,
+        "k": args.k
+    }
+
+    with engine.connect() as conn:
+        queries = sample_queries(conn, args.queries)
+        if not queries:
+            print("No embedded papers to query")
+            return
+
+        table_size = conn.execute(text("SELECT pg_total_relation_size('papers')")).scalar()
+        print(f"papers={table_size / 2**20:.1f}MB queries={len(queries)} k={args.k}")
+
+        exact_sql = nearest_papers_sql("CAST(:embedding AS vector)", ":k", where="p.id <> :paper_id", mode="full")
+        conn.execute(text("SET LOCAL enable_indexscan = off"))
+        truth = [set(run_query(conn, exact_sql, embedding, paper_id, params)) for paper_id, embedding in queries]
+        conn.rollback()
+
+        for mode, index_name in MODE_INDEXES.items():
+            size = index_size(conn, index_name)
+            if size is None:
+                print(f"{mode:>6}: index {index_name} missing, skipped")
+                continue
+
+            sql = nearest_papers_sql("CAST(:embedding AS vector)", ":k", where="p.id <> :paper_id", mode=mode)
+            latencies = []
+            recalls = []
+            for (paper_id, embedding), expected in zip(queries, truth):
+                prepare_vector_search(conn, args.k, mode=mode)
+                started = time.perf_counter()
+                found = run_query(conn, sql, embedding, paper_id, params)
+                latencies.append((time.perf_counter() - started) * 1000)
+                conn.rollback()
+                if expected:
+                    recalls.append(len(expected.intersection(found)) / len(expected))
+
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(
+                f"{mode:>6}: recall@{args.k}={statistics.mean(recalls):.3f} "
+                f"mean={statistics.mean(latencies):.2f}ms p95={p95:.2f}ms "
+                f"index={size / 2**20:.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,69 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Literal, Optional
 
 class Settings(BaseSettings):
     database_url: str
+    database_replica_urls: Optional[str] = None
+    replica_health_check_interval_seconds: float = 10.0
+    replica_max_lag_seconds: float = 5.0
+    read_your_writes_window_seconds: float = 5.0
     groq_api_key: str
     jwt_secret_key: str
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 10080
+    context_cache_size: int = 512
+    summary_input_chars: int = 12000
+    map_reduce_concurrency: int = 4
+    map_max_tokens: int = 500
+    map_cache_size: int = 2048
+    embedding_model_name: str = "all-MiniLM-L6-v2"
+    related_papers_k: int = 20
+    related_papers_candidate_factor: int = 4
+    vector_search_mode: Literal["full", "half", "binary"] = "full"
+    vector_shortlist_factor: int = 10
+    chat_context_max_papers: int = 50
+    vector_index_cache_mb: int = 256
+    vector_index_dir: Optional[str] = None
+    rate_limit_enabled: bool = True
+    chat_rate_per_minute: float = 20
+    chat_rate_burst: int = 5
+    search_rate_per_minute: float = 30
+    search_rate_burst: int = 10
+    upload_rate_per_minute: float = 10
+    upload_rate_burst: int = 3
+    upload_session_rate_per_minute: float = 10
+    upload_session_rate_burst: int = 5
+    upload_chunk_rate_per_minute: float = 240
+    upload_chunk_rate_burst: int = 32
+    max_concurrent_expensive_requests: int = 8
+    max_queued_expensive_requests: int = 32
+    admission_queue_timeout_seconds: float = 10.0
+    admission_retry_after_seconds: int = 5
+    trace_export_path: Optional[str] = None
+    slow_request_threshold_ms: float = 2000
+    profile_slow_requests: bool = False
+    profile_sample_rate: float = 0.1
+    profile_interval_ms: float = 5
+    profile_dir: str = "profiles"
+    debug: bool = False
+    arxiv_id_batch_size: int = 100
+    arxiv_max_concurrency: int = 2
+    arxiv_min_interval_seconds: float = 3.0
+    arxiv_bulk_max_ids: int = 1000
+    arxiv_page_cache_size: int = 256
+    arxiv_page_cache_ttl_seconds: float = 600
+    export_batch_size: int = 500
+    import_batch_size: int = 500
+    import_spool_bytes: int = 16 * 2**20
+    import_max_bytes: int = 256 * 2**20
+    upload_dir: str = "uploads"
+    max_upload_bytes: int = 512 * 2**20
+    upload_chunk_max_bytes: int = 16 * 2**20
+    upload_session_ttl_hours: float = 24
+    max_open_uploads_per_user: int = 5
+    max_open_upload_bytes_per_user: int = 1024 * 2**20
+    message_partition_months_ahead: int = 3
 
     class Config:
         env_file = ".env"
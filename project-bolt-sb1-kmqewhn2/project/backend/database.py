@@ -1,15 +1,174 @@
-from sqlalchemy import create_engine, text
+import itertools
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import DBAPIError, OperationalError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import get_settings
+from utils.cache import LRUCache
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Set by get_current_user so commits can be attributed to the requesting user.
+current_user_id: ContextVar[Optional[str]] = ContextVar("current_user_id", default=None)
+
+# Users who committed on the primary recently; their reads skip the replicas so
+# they never see a state older than their own write. This is per process: with
+# several workers the guarantee only holds for requests served by the worker
+# that took the write (see README, Read Replicas).
+recent_writers = LRUCache(maxsize=100000, ttl=settings.read_your_writes_window_seconds)
+
+@event.listens_for(engine, "commit")
+def _record_write(conn):
+    user_id = current_user_id.get()
+    if user_id is not None:
+        recent_writers.set(user_id, True)
+
+class Replica:
+    def __init__(self, url: str):
+        self.engine = create_engine(url, pool_pre_ping=True)
+        self.healthy = True
+
+class ReplicaRouter:
+    def __init__(self, urls: list, check_interval: float, max_lag: float):
+        self.replicas = [Replica(url) for url in urls]
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._counter = itertools.count()
+        # Replicas start unhealthy, so reads go to the primary until the first check passes.
+        for replica in self.replicas:
+            replica.healthy = False
+        # Health checks connect and query, so they run on their own thread
+        # rather than in a request on the event loop.
+        threading.Thread(target=self._run, name="replica-health-check", daemon=True).start()
+
+    @property
+    def engines(self) -> list:
+        return [replica.engine for replica in self.replicas]
+
+    def _run(self) -> None:
+        # Nothing may end this loop: health would then stay frozen as it was.
+        while True:
+            for replica in self.replicas:
+                try:
+                    self._check(replica)
+                except Exception:
+                    logger.exception("Health check of replica %s crashed", replica.engine.url)
+            time.sleep(self.check_interval)
+
+    def _check(self, replica: Replica) -> None:
+        # Replay position equal to receive position means the replica is caught
+        # up even when the primary has been idle; on a primary both are NULL.
+        try:
+            with replica.engine.connect() as conn:
+                lag = conn.execute(text("""
+                    SELECT CASE
+                        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                    END
+                """)).scalar()
+            healthy = lag <= self.max_lag
+            if not healthy:
+                logger.warning("Replica %s is %.1fs behind; routing reads elsewhere", replica.engine.url, lag)
+        except Exception as e:
+            # Pool timeouts and other non-DBAPI errors count as failures too.
+            logger.warning("Replica %s failed health check: %s", replica.engine.url, e)
+            healthy = False
+        replica.healthy = healthy
+
+    def mark_unhealthy(self, replica: Replica) -> None:
+        # Stays out of rotation until the next health check passes.
+        replica.healthy = False
+
+    def candidates(self):
+        # Round-robin starting point over the replicas that passed their last check.
+        start = next(self._counter)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.healthy:
+                yield replica
+
+replica_urls = [url.strip() for url in (settings.database_replica_urls or "").split(",") if url.strip()]
+replica_router = ReplicaRouter(
+    replica_urls,
+    check_interval=settings.replica_health_check_interval_seconds,
+    max_lag=settings.replica_max_lag_seconds
+) if replica_urls else None
+
+def _replica_failed(error: DBAPIError) -> bool:
+    # Lost connections and statements the replica cancelled (failover, recovery
+    # conflicts) are OperationalErrors; bad input or SQL errors are not retried.
+    return isinstance(error, OperationalError) or error.connection_invalidated
+
+class ReplicaConnection:
+    # Wraps a replica connection for read_connection. When a statement fails
+    # because of the replica, the replica is taken out of rotation and that
+    # statement and the rest of the block run on the primary; the handlers
+    # using read_connection only read, so running a statement again is safe.
+    def __init__(self, replica: Replica, conn, stack: ExitStack):
+        self._replica = replica
+        self._conn = conn
+        self._stack = stack
+        self._options = {}
+
+    def execution_options(self, **options):
+        self._options.update(options)
+        self._conn = self._conn.execution_options(**options)
+        return self
+
+    def execute(self, *args, **kwargs):
+        if self._replica is None:
+            return self._conn.execute(*args, **kwargs)
+        try:
+            return self._conn.execute(*args, **kwargs)
+        except DBAPIError as e:
+            if not _replica_failed(e):
+                raise
+            logger.warning("Replica %s failed a read, retrying on the primary: %s", self._replica.engine.url, e)
+            replica_router.mark_unhealthy(self._replica)
+            self._replica = None
+            self._conn = self._stack.enter_context(engine.connect()).execution_options(**self._options)
+            return self._conn.execute(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+@contextmanager
+def read_connection():
+    # Connections for read-only handlers. Falls back to the primary when no
+    # replica is configured or healthy, when a replica fails mid-request, or
+    # when the user has just written.
+    user_id = current_user_id.get()
+    with ExitStack() as stack:
+        if replica_router is not None and not (user_id is not None and recent_writers.get(user_id)):
+            for replica in replica_router.candidates():
+                try:
+                    conn = stack.enter_context(replica.engine.connect())
+                except DBAPIError as e:
+                    logger.warning("Replica %s unavailable: %s", replica.engine.url, e)
+                    replica_router.mark_unhealthy(replica)
+                    continue
+                except PoolTimeoutError:
+                    # Busy, not broken: try the next replica or the primary
+                    # and leave it in rotation.
+                    logger.warning("Replica %s pool exhausted, reading elsewhere", replica.engine.url)
+                    continue
+                yield ReplicaConnection(replica, conn, stack)
+                return
+
+        yield stack.enter_context(engine.connect())
+
 def get_db():
     db = SessionLocal()
     try:
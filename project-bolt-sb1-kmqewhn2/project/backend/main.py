@@ -1,11 +1,18 @@
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from routers import auth, workspaces, papers, chat
+from utils.serialization import FastJSONResponse
+from utils.tracing import TracingMiddleware, instrument_engine
+from utils.query_stats import QueryStatsMiddleware, instrument_query_stats, query_budget
+from utils.message_partitions import ensure_message_partitions
+from database import engine, replica_router
 
 app = FastAPI(
     title="ResearchHub AI API",
     description="Intelligent research paper management and analysis system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 app.add_middleware(
@@ -14,14 +21,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Request-ID", "X-Next-Start", "X-Total-Results",
+        "X-DB-Statements", "X-DB-Round-Trips", "X-DB-Rows", "X-DB-Connections", "X-DB-Time-Ms"
+    ],
 )
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(TracingMiddleware)
+
+for db_engine in [engine] + (replica_router.engines if replica_router is not None else []):
+    instrument_engine(db_engine)
+    instrument_query_stats(db_engine)
 
 app.include_router(auth.router)
 app.include_router(workspaces.router)
 app.include_router(papers.router)
 app.include_router(chat.router)
 
+@app.on_event("startup")
+async def create_message_partitions():
+    # Messages are partitioned by month; without pg_cron nothing else creates
+    # upcoming months, and inserts into a month without one fail.
+    await run_in_threadpool(ensure_message_partitions)
+
 @app.get("/")
+@query_budget(statements=0, connections=0)
 async def root():
     return {
         "message": "ResearchHub AI API",
@@ -30,6 +54,7 @@ async def root():
     }
 
 @app.get("/health")
+@query_budget(statements=0, connections=0)
 async def health_check():
     return {"status": "healthy"}
 
@@ -1,6 +1,9 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Literal
 from datetime import datetime, date
+from config import get_settings
+
+settings = get_settings()
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -38,6 +41,12 @@ class WorkspaceResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class WorkspaceImportResponse(BaseModel):
+    workspace: WorkspaceResponse
+    papers: int
+    conversations: int
+    messages: int
+
 class PaperCreate(BaseModel):
     title: str
     authors: List[str] = []
@@ -58,13 +67,48 @@ class PaperResponse(BaseModel):
     doi: Optional[str]
     created_at: datetime
 
+class RelatedPaperResponse(PaperResponse):
+    similarity: float
+
 class PaperImport(BaseModel):
     workspace_id: str
     paper_id: str
 
+class ArxivBulkImport(BaseModel):
+    arxiv_ids: List[str] = Field(max_length=settings.arxiv_bulk_max_ids)
+    workspace_id: Optional[str] = None
+
+class ArxivBulkImportResponse(BaseModel):
+    imported: List[PaperResponse]
+    skipped: List[str]
+    not_found: List[str]
+
+class UploadInit(BaseModel):
+    filename: str
+    size: int
+    sha256: str
+    title: str = ""
+    authors: List[str] = []
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    filename: str
+    size: int
+    offset: int
+    chunk_size: int
+    expires_at: datetime
+    paper: Optional[PaperResponse] = None
+
 class SearchQuery(BaseModel):
     query: str
     limit: int = 10
+    start: int = 0
+    prefetch: bool = True
+
+class HybridSearchQuery(BaseModel):
+    query: str
+    workspace_id: Optional[str] = None
+    limit: int = 10
 
 class ConversationCreate(BaseModel):
     workspace_id: str
@@ -77,6 +121,13 @@ class ConversationResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class WorkspaceOverview(BaseModel):
+    workspace: WorkspaceResponse
+    paper_count: int
+    conversation_count: int
+    papers: List[PaperResponse]
+    conversations: List[ConversationResponse]
+
 class MessageCreate(BaseModel):
     conversation_id: str
     content: str
@@ -92,6 +143,7 @@ class ChatRequest(BaseModel):
     workspace_id: str
     conversation_id: str
     message: str
+    mode: Literal["standard", "map_reduce"] = "standard"
 
 class ChatResponse(BaseModel):
     message: MessageResponse
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, status
 from models.schemas import UserCreate, UserLogin, Token, UserResponse
+from utils.query_stats import query_budget
 from utils.auth import get_password_hash, verify_password, create_access_token
 from database import execute_query
 from sqlalchemy import text
@@ -9,6 +10,7 @@ from datetime import datetime
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
+@query_budget(statements=2)
 async def register(user_data: UserCreate):
     with engine.connect() as conn:
         existing_user = conn.execute(
@@ -58,6 +60,7 @@ async def register(user_data: UserCreate):
         )
 
 @router.post("/login", response_model=Token)
+@query_budget(statements=1)
 async def login(credentials: UserLogin):
     with engine.connect() as conn:
         result = conn.execute(
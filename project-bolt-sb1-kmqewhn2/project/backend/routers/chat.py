@@ -1,18 +1,62 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+import asyncio
+import json
+import logging
+from fastapi import APIRouter, HTTPException, status, Depends, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
 from models.schemas import (
     ChatRequest, ChatResponse, MessageResponse,
     ConversationCreate, ConversationResponse
 )
-from utils.auth import get_current_user
-from utils.ai import generate_chat_response, build_context_from_papers, create_research_assistant_prompt
-from database import engine
+from utils.query_stats import query_budget
+from utils.auth import get_current_user, decode_token
+from utils.rate_limit import rate_limited, check_rate_limit, expensive_slot
+from utils.ai import (
+    generate_chat_response, stream_chat_response, generate_embedding,
+    build_context_from_papers, create_research_assistant_prompt
+)
+from utils.workspace_context import get_workspace_snapshot
+from utils.summaries import load_workspace_summaries, map_reduce_chat_response
+from utils.vector_index import get_workspace_index
+from utils.message_partitions import insert_messages
+from config import get_settings
+from utils.serialization import rows_response
+from utils.etag import make_etag, etag_matches, etag_headers, not_modified
+from database import engine, read_connection, current_user_id
 from sqlalchemy import text
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+CHAT_HISTORY_MESSAGES = 10
+
+CONVERSATION_CONTEXT_QUERY = """
+    SELECT c.id, c.workspace_id, v.total, v.version FROM conversations c
+    JOIN workspaces w ON c.workspace_id = w.id
+    CROSS JOIN LATERAL (
+        SELECT count(*) AS total, max(added_at) AS version
+        FROM workspace_papers
+        WHERE workspace_id = c.workspace_id
+    ) v
+    WHERE c.id = :conversation_id AND w.user_id = :user_id
+"""
+
+def select_context(snapshot: dict, index, message: str) -> str:
+    # Large workspaces only send the papers most similar to the message. Embeds
+    # the message, so callers run it in the threadpool.
+    if index is None:
+        return snapshot["context"]
+    papers_by_id = {paper["id"]: paper for paper in snapshot["papers"]}
+    ranked = index.top_k(generate_embedding(message), settings.chat_context_max_papers)
+    return build_context_from_papers(
+        [papers_by_id[paper_id] for paper_id, _ in ranked if paper_id in papers_by_id]
+    )
+
 @router.post("/conversations", response_model=ConversationResponse, status_code=status.HTTP_201_CREATED)
+@query_budget(statements=2)
 async def create_conversation(
     conversation_data: ConversationCreate,
     current_user: str = Depends(get_current_user)
@@ -54,13 +98,24 @@ async def create_conversation(
         )
 
 @router.get("/conversations/workspace/{workspace_id}", response_model=List[ConversationResponse])
+@query_budget(statements=2)
 async def get_workspace_conversations(
     workspace_id: str,
+    request: Request,
     current_user: str = Depends(get_current_user)
 ):
-    with engine.connect() as conn:
+    with read_connection() as conn:
         workspace = conn.execute(
-            text("SELECT id FROM workspaces WHERE id = :workspace_id AND user_id = :user_id"),
+            text("""
+                SELECT w.id, v.total, v.version
+                FROM workspaces w
+                CROSS JOIN LATERAL (
+                    SELECT count(*) AS total, max(updated_at) AS version
+                    FROM conversations
+                    WHERE workspace_id = w.id
+                ) v
+                WHERE w.id = :workspace_id AND w.user_id = :user_id
+            """),
             {"workspace_id": workspace_id, "user_id": current_user}
         ).fetchone()
 
@@ -70,6 +125,10 @@ async def get_workspace_conversations(
                 detail="Workspace not found"
             )
 
+        etag = make_etag("conversations", current_user, workspace_id, workspace.total, workspace.version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         result = conn.execute(
             text("""
                 SELECT id, workspace_id, title, created_at, updated_at
@@ -79,29 +138,29 @@ async def get_workspace_conversations(
             """),
             {"workspace_id": workspace_id}
         )
-        conversations = result.fetchall()
-
-        return [
-            ConversationResponse(
-                id=str(conv.id),
-                workspace_id=str(conv.workspace_id),
-                title=conv.title,
-                created_at=conv.created_at,
-                updated_at=conv.updated_at
-            )
-            for conv in conversations
-        ]
+        return rows_response(result, ConversationResponse, headers=etag_headers(etag))
 
 @router.get("/conversations/{conversation_id}/messages", response_model=List[MessageResponse])
+@query_budget(statements=2)
 async def get_conversation_messages(
     conversation_id: str,
+    request: Request,
+    include_archived: bool = False,
     current_user: str = Depends(get_current_user)
 ):
-    with engine.connect() as conn:
+    # Archived months are read-only, so the live table's marker still versions the result.
+    source = "messages_with_archive" if include_archived else "messages"
+
+    with read_connection() as conn:
         conversation = conn.execute(
             text("""
-                SELECT c.id FROM conversations c
+                SELECT c.id, v.total, v.version FROM conversations c
                 JOIN workspaces w ON c.workspace_id = w.id
+                CROSS JOIN LATERAL (
+                    SELECT count(*) AS total, max(created_at) AS version
+                    FROM messages
+                    WHERE conversation_id = c.id
+                ) v
                 WHERE c.id = :conversation_id AND w.user_id = :user_id
             """),
             {"conversation_id": conversation_id, "user_id": current_user}
@@ -113,40 +172,30 @@ async def get_conversation_messages(
                 detail="Conversation not found"
             )
 
+        etag = make_etag(source, current_user, conversation_id, conversation.total, conversation.version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         result = conn.execute(
-            text("""
+            text(f"""
                 SELECT id, conversation_id, role, content, created_at
-                FROM messages
+                FROM {source}
                 WHERE conversation_id = :conversation_id
                 ORDER BY created_at ASC
             """),
             {"conversation_id": conversation_id}
         )
-        messages = result.fetchall()
-
-        return [
-            MessageResponse(
-                id=str(msg.id),
-                conversation_id=str(msg.conversation_id),
-                role=msg.role,
-                content=msg.content,
-                created_at=msg.created_at
-            )
-            for msg in messages
-        ]
+        return rows_response(result, MessageResponse, headers=etag_headers(etag))
 
-@router.post("", response_model=ChatResponse)
+@router.post("", response_model=ChatResponse, dependencies=[Depends(rate_limited("chat"))])
+@query_budget(statements=6, connections=2)
 async def chat(
     chat_request: ChatRequest,
     current_user: str = Depends(get_current_user)
 ):
     with engine.connect() as conn:
         conversation = conn.execute(
-            text("""
-                SELECT c.id, c.workspace_id FROM conversations c
-                JOIN workspaces w ON c.workspace_id = w.id
-                WHERE c.id = :conversation_id AND w.user_id = :user_id
-            """),
+            text(CONVERSATION_CONTEXT_QUERY),
             {"conversation_id": chat_request.conversation_id, "user_id": current_user}
         ).fetchone()
 
@@ -156,94 +205,82 @@ async def chat(
                 detail="Conversation not found"
             )
 
-        papers_result = conn.execute(
-            text("""
-                SELECT p.id, p.title, p.authors, p.abstract, p.pdf_text
-                FROM papers p
-                JOIN workspace_papers wp ON p.id = wp.paper_id
-                WHERE wp.workspace_id = :workspace_id
-            """),
-            {"workspace_id": chat_request.workspace_id}
+        snapshot = get_workspace_snapshot(
+            conn, str(conversation.workspace_id), (conversation.total, conversation.version)
         )
-        papers = papers_result.fetchall()
 
-        papers_list = [
-            {
-                "id": str(paper.id),
-                "title": paper.title,
-                "authors": paper.authors,
-                "abstract": paper.abstract,
-                "pdf_text": paper.pdf_text
-            }
-            for paper in papers
-        ]
+        index = None
+        if len(snapshot["papers"]) > settings.chat_context_max_papers:
+            index = get_workspace_index(
+                conn, str(conversation.workspace_id), (conversation.total, conversation.version)
+            )
 
-        context = build_context_from_papers(papers_list)
+        summaries = []
+        if chat_request.mode == "map_reduce":
+            summaries = load_workspace_summaries(conn, str(conversation.workspace_id))
 
+        # The most recent messages, oldest first, as in the WebSocket session.
         messages_result = conn.execute(
             text("""
-                SELECT role, content FROM messages
-                WHERE conversation_id = :conversation_id
+                SELECT role, content FROM (
+                    SELECT role, content, created_at FROM messages
+                    WHERE conversation_id = :conversation_id
+                    ORDER BY created_at DESC
+                    LIMIT :limit
+                ) recent
                 ORDER BY created_at ASC
-                LIMIT 10
             """),
-            {"conversation_id": chat_request.conversation_id}
+            {"conversation_id": chat_request.conversation_id, "limit": CHAT_HISTORY_MESSAGES}
         )
         history = messages_result.fetchall()
 
-        conversation_messages = create_research_assistant_prompt(context, chat_request.message)
-
-        for msg in history:
-            conversation_messages.append({"role": msg.role, "content": msg.content})
+    # The pooled connection is released before generation, which can take
+    # several seconds; writes happen afterwards on a fresh, short checkout.
+    history_messages = [{"role": msg.role, "content": msg.content} for msg in history]
 
-        conversation_messages.append({"role": "user", "content": chat_request.message})
-
-        try:
-            ai_response = generate_chat_response(conversation_messages)
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error generating AI response: {str(e)}"
-            )
-
-        user_message_result = conn.execute(
-            text("""
-                INSERT INTO messages (conversation_id, role, content, created_at)
-                VALUES (:conversation_id, :role, :content, :created_at)
-                RETURNING id, conversation_id, role, content, created_at
-            """),
-            {
-                "conversation_id": chat_request.conversation_id,
-                "role": "user",
-                "content": chat_request.message,
-                "created_at": datetime.utcnow()
-            }
+    try:
+        if summaries:
+            ai_response = await map_reduce_chat_response(summaries, chat_request.message, history_messages)
+        else:
+            context = await run_in_threadpool(select_context, snapshot, index, chat_request.message)
+            conversation_messages = create_research_assistant_prompt(context, chat_request.message)
+            conversation_messages.extend(history_messages)
+            conversation_messages.append({"role": "user", "content": chat_request.message})
+            ai_response = await run_in_threadpool(generate_chat_response, conversation_messages)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating AI response: {str(e)}"
         )
-        user_message = user_message_result.fetchone()
 
-        assistant_message_result = conn.execute(
+    # Both messages and the conversation timestamp are written in one statement.
+    with engine.connect() as conn:
+        user_message, assistant_message = insert_messages(
+            conn,
             text("""
-                INSERT INTO messages (conversation_id, role, content, created_at)
-                VALUES (:conversation_id, :role, :content, :created_at)
-                RETURNING id, conversation_id, role, content, created_at
+                WITH inserted AS (
+                    INSERT INTO messages (conversation_id, role, content, created_at)
+                    VALUES (:conversation_id, 'user', :message, :user_created_at),
+                           (:conversation_id, 'assistant', :response, :assistant_created_at)
+                    RETURNING id, conversation_id, role, content, created_at
+                ),
+                touched AS (
+                    UPDATE conversations
+                    SET updated_at = :assistant_created_at
+                    WHERE id = :conversation_id
+                )
+                SELECT id, conversation_id, role, content, created_at
+                FROM inserted
+                ORDER BY role = 'assistant'
             """),
             {
                 "conversation_id": chat_request.conversation_id,
-                "role": "assistant",
-                "content": ai_response,
-                "created_at": datetime.utcnow()
+                "message": chat_request.message,
+                "user_created_at": datetime.utcnow(),
+                "response": ai_response,
+                "assistant_created_at": datetime.utcnow()
             }
-        )
-        assistant_message = assistant_message_result.fetchone()
-
-        conn.execute(
-            text("""
-                UPDATE conversations
-                SET updated_at = :updated_at
-                WHERE id = :conversation_id
-            """),
-            {"conversation_id": chat_request.conversation_id, "updated_at": datetime.utcnow()}
-        )
+        ).fetchall()
         conn.commit()
 
         return ChatResponse(
@@ -264,6 +301,7 @@ async def chat(
         )
 
 @router.delete("/conversations/{conversation_id}", status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(statements=1)
 async def delete_conversation(
     conversation_id: str,
     current_user: str = Depends(get_current_user)
@@ -288,3 +326,172 @@ async def delete_conversation(
             )
 
         return None
+
+def load_chat_session(conversation_id: str, user_id: str):
+    with engine.connect() as conn:
+        conversation = conn.execute(
+            text(CONVERSATION_CONTEXT_QUERY),
+            {"conversation_id": conversation_id, "user_id": user_id}
+        ).fetchone()
+
+        if not conversation:
+            return None
+
+        workspace_id = str(conversation.workspace_id)
+        version = (conversation.total, conversation.version)
+        snapshot = get_workspace_snapshot(conn, workspace_id, version)
+
+        index = None
+        if len(snapshot["papers"]) > settings.chat_context_max_papers:
+            index = get_workspace_index(conn, workspace_id, version)
+
+        history = conn.execute(
+            text("""
+                SELECT role, content FROM (
+                    SELECT role, content, created_at FROM messages
+                    WHERE conversation_id = :conversation_id
+                    ORDER BY created_at DESC
+                    LIMIT :limit
+                ) recent
+                ORDER BY created_at ASC
+            """),
+            {"conversation_id": conversation_id, "limit": CHAT_HISTORY_MESSAGES}
+        ).fetchall()
+
+    return {
+        "workspace_id": workspace_id,
+        "snapshot": snapshot,
+        "index": index,
+        "history": [{"role": row.role, "content": row.content} for row in history]
+    }
+
+def load_session_summaries(workspace_id: str) -> list:
+    with engine.connect() as conn:
+        return load_workspace_summaries(conn, workspace_id)
+
+def persist_chat_turn(conversation_id: str, user_content: str, user_created_at: datetime,
+                      assistant_content: str, assistant_created_at: datetime) -> None:
+    # Both messages and the conversation timestamp in one statement.
+    try:
+        with engine.connect() as conn:
+            insert_messages(
+                conn,
+                text("""
+                    WITH inserted AS (
+                        INSERT INTO messages (conversation_id, role, content, created_at)
+                        VALUES (:conversation_id, 'user', :user_content, :user_created_at),
+                               (:conversation_id, 'assistant', :assistant_content, :assistant_created_at)
+                        RETURNING conversation_id
+                    )
+                    UPDATE conversations
+                    SET updated_at = GREATEST(updated_at, :assistant_created_at)
+                    WHERE id = :conversation_id
+                """),
+                {
+                    "conversation_id": conversation_id,
+                    "user_content": user_content,
+                    "user_created_at": user_created_at,
+                    "assistant_content": assistant_content,
+                    "assistant_created_at": assistant_created_at
+                }
+            )
+            conn.commit()
+    except Exception:
+        logger.exception("Failed to persist chat turn for conversation %s", conversation_id)
+
+@router.websocket("/ws/{conversation_id}")
+async def chat_websocket(websocket: WebSocket, conversation_id: str, token: str = ""):
+    # Authentication, ownership and workspace context are resolved once per
+    # session; each turn then streams tokens and persists in the background.
+    try:
+        user_id = decode_token(token).get("sub")
+    except HTTPException:
+        user_id = None
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Could not validate credentials")
+        return
+    current_user_id.set(user_id)
+
+    session = load_chat_session(conversation_id, user_id)
+    if session is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Conversation not found")
+        return
+
+    await websocket.accept()
+    history = session["history"]
+    summaries = None
+    pending = set()
+
+    async def send_error(detail: str, retry_after: Optional[int] = None):
+        payload = {"type": "error", "detail": detail}
+        if retry_after is not None:
+            payload["retry_after"] = retry_after
+        await websocket.send_json(payload)
+
+    try:
+        while True:
+            try:
+                payload = json.loads(await websocket.receive_text())
+            except ValueError:
+                await send_error("Messages must be JSON")
+                continue
+
+            message = payload.get("message") if isinstance(payload, dict) else None
+            if not isinstance(message, str) or not message.strip():
+                await send_error("Message is required")
+                continue
+
+            try:
+                check_rate_limit("chat", user_id)
+            except HTTPException as e:
+                await send_error(e.detail, int(e.headers["Retry-After"]))
+                continue
+
+            user_created_at = datetime.utcnow()
+            try:
+                async with expensive_slot():
+                    if payload.get("mode") == "map_reduce" and summaries is None:
+                        summaries = load_session_summaries(session["workspace_id"])
+
+                    if payload.get("mode") == "map_reduce" and summaries:
+                        reply = await map_reduce_chat_response(summaries, message, list(history))
+                        await websocket.send_json({"type": "token", "content": reply})
+                    else:
+                        context = await run_in_threadpool(
+                            select_context, session["snapshot"], session["index"], message
+                        )
+                        conversation_messages = create_research_assistant_prompt(context, message)
+                        conversation_messages.extend(history)
+                        conversation_messages.append({"role": "user", "content": message})
+
+                        parts = []
+                        async for part in iterate_in_threadpool(stream_chat_response(conversation_messages)):
+                            parts.append(part)
+                            await websocket.send_json({"type": "token", "content": part})
+                        reply = "".join(parts)
+            except HTTPException as e:
+                await send_error(e.detail, settings.admission_retry_after_seconds)
+                continue
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                await send_error(f"Error generating AI response: {str(e)}")
+                continue
+
+            assistant_created_at = datetime.utcnow()
+            await websocket.send_json({"type": "done", "content": reply})
+
+            history.append({"role": "user", "content": message})
+            history.append({"role": "assistant", "content": reply})
+            del history[:-CHAT_HISTORY_MESSAGES]
+
+            task = asyncio.create_task(run_in_threadpool(
+                persist_chat_turn, conversation_id, message, user_created_at, reply, assistant_created_at
+            ))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if pending:
+            await asyncio.gather(*pending)
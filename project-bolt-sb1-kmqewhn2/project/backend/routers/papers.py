@@ -1,122 +1,302 @@
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File
-from models.schemas import PaperCreate, PaperResponse, PaperImport, SearchQuery
+from fastapi import APIRouter, HTTPException, status, Depends, Query, UploadFile, File, Request, Response, BackgroundTasks
+from models.schemas import (
+    PaperResponse, RelatedPaperResponse, PaperImport, SearchQuery, HybridSearchQuery,
+    ArxivBulkImport, ArxivBulkImportResponse, UploadInit, UploadSessionResponse
+)
+from utils.query_stats import query_budget
 from utils.auth import get_current_user
-from utils.ai import generate_embedding
-from utils.pdf_parser import extract_text_from_pdf_bytes
-from database import engine
+from utils.rate_limit import rate_limited, check_rate_limit
+from utils.arxiv import (
+    normalize_arxiv_id, is_valid_arxiv_id, base_arxiv_id, fetch_many_arxiv_ids, insert_arxiv_papers,
+    search_arxiv, prefetch_arxiv_page
+)
+from fastapi.concurrency import run_in_threadpool
+from utils.ai import generate_embedding, generate_embeddings
+from utils.pdf_parser import extract_text_from_pdf_bytes, compute_content_hash
+from utils.serialization import rows_response
+from utils.workspace_context import invalidate_workspace_context
+from utils.summaries import generate_paper_summary
+from utils.neighbors import update_paper_neighbors
+from utils.vector_index import get_workspace_index, invalidate_workspace_index, parse_embedding
+from utils.vector_search import nearest_papers_sql, vector_search_params, prepare_vector_search
+from utils.etag import make_etag, etag_matches, etag_headers, not_modified
+from utils.uploads import (
+    upload_path, received_bytes, discard_upload, write_chunk, file_sha256, read_upload
+)
+from database import engine, read_connection
+from config import get_settings
 from sqlalchemy import text
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 import httpx
+import re
+import xml.etree.ElementTree as ET
+
+settings = get_settings()
 
 router = APIRouter(prefix="/papers", tags=["Papers"])
 
-@router.post("/search", response_model=List[PaperResponse])
+# Reciprocal rank fusion constant; 60 is the value from the original RRF paper.
+RRF_K = 60
+HYBRID_MIN_CANDIDATES = 40
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+@router.post("/search", response_model=List[PaperResponse], dependencies=[Depends(rate_limited("search"))])
+@query_budget(statements=2, connections=2)
 async def search_papers(
     search_query: SearchQuery,
+    response: Response,
+    background_tasks: BackgroundTasks,
     current_user: str = Depends(get_current_user)
 ):
     query = search_query.query
     limit = search_query.limit
+    start = max(search_query.start, 0)
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "http://export.arxiv.org/api/query",
-                params={
-                    "search_query": f"all:{query}",
-                    "start": 0,
-                    "max_results": limit
-                },
-                timeout=30.0
-            )
+        page = await search_arxiv(query, start, limit)
+    except (httpx.HTTPError, ET.ParseError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error fetching papers from arXiv: {str(e)}"
+        )
 
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Error fetching papers from arXiv"
-                )
+    arxiv_ids = [paper.arxiv_id for paper in page.papers if paper.arxiv_id]
 
-            import xml.etree.ElementTree as ET
-            root = ET.fromstring(response.content)
+    with engine.connect() as conn:
+        existing = conn.execute(
+            text("""
+                SELECT id, title, authors, abstract, publication_date, pdf_url, arxiv_id, doi, created_at
+                FROM papers
+                WHERE arxiv_id = ANY(:arxiv_ids)
+            """),
+            {"arxiv_ids": arxiv_ids}
+        ).fetchall()
 
-            namespace = {
-                'atom': 'http://www.w3.org/2005/Atom',
-                'arxiv': 'http://arxiv.org/schemas/atom'
-            }
+    rows_by_arxiv_id = {row.arxiv_id: row for row in existing}
+    new_papers = [paper for paper in page.papers if paper.arxiv_id and paper.arxiv_id not in rows_by_arxiv_id]
+
+    # Only papers we have not stored yet need embedding; the rest are served as-is.
+    if new_papers:
+        embeddings = await run_in_threadpool(
+            generate_embeddings, [paper.title + " " + paper.abstract for paper in new_papers]
+        )
+        with engine.connect() as conn:
+            inserted = insert_arxiv_papers(conn, new_papers, embeddings)
+            conn.commit()
 
-            papers = []
-            for entry in root.findall('atom:entry', namespace):
-                title_elem = entry.find('atom:title', namespace)
-                summary_elem = entry.find('atom:summary', namespace)
-                published_elem = entry.find('atom:published', namespace)
-                id_elem = entry.find('atom:id', namespace)
-
-                authors = []
-                for author in entry.findall('atom:author', namespace):
-                    name_elem = author.find('atom:name', namespace)
-                    if name_elem is not None and name_elem.text:
-                        authors.append(name_elem.text)
-
-                arxiv_id = id_elem.text.split('/abs/')[-1] if id_elem is not None else None
-
-                paper_data = PaperCreate(
-                    title=title_elem.text.strip() if title_elem is not None else "Untitled",
-                    authors=authors,
-                    abstract=summary_elem.text.strip() if summary_elem is not None else "",
-                    publication_date=published_elem.text.split('T')[0] if published_elem is not None else None,
-                    arxiv_id=arxiv_id,
-                    pdf_url=f"https://arxiv.org/pdf/{arxiv_id}.pdf" if arxiv_id else None
+        for row in inserted:
+            rows_by_arxiv_id[row.arxiv_id] = row
+            if row.inserted:
+                background_tasks.add_task(update_paper_neighbors, str(row.id))
+
+    if page.total is not None:
+        response.headers["X-Total-Results"] = str(page.total)
+    if page.next_start is not None:
+        response.headers["X-Next-Start"] = str(page.next_start)
+        if search_query.prefetch:
+            prefetch_arxiv_page(query, page.next_start, limit)
+
+    papers = []
+    for arxiv_id in dict.fromkeys(arxiv_ids):
+        paper = rows_by_arxiv_id.get(arxiv_id)
+        if paper is None:
+            continue
+        papers.append(PaperResponse(
+            id=str(paper.id),
+            title=paper.title,
+            authors=paper.authors,
+            abstract=paper.abstract,
+            publication_date=paper.publication_date,
+            pdf_url=paper.pdf_url,
+            arxiv_id=paper.arxiv_id,
+            doi=paper.doi,
+            created_at=paper.created_at
+        ))
+
+    return papers
+
+@router.post("/arxiv/bulk", response_model=ArxivBulkImportResponse, dependencies=[Depends(rate_limited("upload"))])
+@query_budget(statements=4, connections=2)
+async def bulk_import_arxiv(
+    bulk_import: ArxivBulkImport,
+    background_tasks: BackgroundTasks,
+    current_user: str = Depends(get_current_user)
+):
+    requested = {}
+    invalid = []
+    for raw_id in bulk_import.arxiv_ids:
+        arxiv_id = normalize_arxiv_id(raw_id)
+        if is_valid_arxiv_id(arxiv_id):
+            requested.setdefault(base_arxiv_id(arxiv_id), arxiv_id)
+        elif arxiv_id:
+            invalid.append(raw_id)
+
+    with engine.connect() as conn:
+        if bulk_import.workspace_id:
+            workspace = conn.execute(
+                text("SELECT id FROM workspaces WHERE id = :workspace_id AND user_id = :user_id"),
+                {"workspace_id": bulk_import.workspace_id, "user_id": current_user}
+            ).fetchone()
+
+            if not workspace:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Workspace not found"
                 )
 
-                with engine.connect() as conn:
-                    embedding = generate_embedding(paper_data.title + " " + paper_data.abstract)
-
-                    result = conn.execute(
-                        text("""
-                            INSERT INTO papers (title, authors, abstract, publication_date, pdf_url, arxiv_id, embedding, created_at)
-                            VALUES (:title, :authors, :abstract, :publication_date, :pdf_url, :arxiv_id, :embedding, :created_at)
-                            ON CONFLICT (arxiv_id) WHERE arxiv_id IS NOT NULL DO UPDATE
-                            SET title = EXCLUDED.title
-                            RETURNING id, title, authors, abstract, publication_date, pdf_url, arxiv_id, created_at
-                        """),
-                        {
-                            "title": paper_data.title,
-                            "authors": paper_data.authors,
-                            "abstract": paper_data.abstract,
-                            "publication_date": paper_data.publication_date,
-                            "pdf_url": paper_data.pdf_url,
-                            "arxiv_id": paper_data.arxiv_id,
-                            "embedding": str(embedding),
-                            "created_at": datetime.utcnow()
-                        }
-                    )
-                    conn.commit()
-                    paper = result.fetchone()
-
-                    papers.append(PaperResponse(
-                        id=str(paper.id),
-                        title=paper.title,
-                        authors=paper.authors,
-                        abstract=paper.abstract,
-                        publication_date=paper.publication_date,
-                        pdf_url=paper.pdf_url,
-                        arxiv_id=paper.arxiv_id,
-                        doi=None,
-                        created_at=paper.created_at
-                    ))
-
-            return papers
+        existing = conn.execute(
+            text("""
+                SELECT id, summary, regexp_replace(arxiv_id, 'v[0-9]+$', '') AS base_id
+                FROM papers
+                WHERE regexp_replace(arxiv_id, 'v[0-9]+$', '') = ANY(:base_ids)
+            """),
+            {"base_ids": list(requested)}
+        ).fetchall()
 
-    except Exception as e:
+    existing_bases = {row.base_id for row in existing}
+    missing = [base_id for base_id in requested if base_id not in existing_bases]
+
+    try:
+        fetched = await fetch_many_arxiv_ids([requested[base_id] for base_id in missing])
+    except httpx.HTTPError as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error searching papers: {str(e)}"
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Error fetching papers from arXiv: {str(e)}"
+        )
+
+    embeddings = await run_in_threadpool(
+        generate_embeddings, [paper.title + " " + paper.abstract for paper in fetched]
+    )
+
+    with engine.connect() as conn:
+        inserted = insert_arxiv_papers(conn, fetched, embeddings)
+
+        if bulk_import.workspace_id:
+            paper_ids = [str(row.id) for row in existing] + [str(row.id) for row in inserted]
+            conn.execute(
+                text("""
+                    INSERT INTO workspace_papers (workspace_id, paper_id, added_at)
+                    SELECT CAST(:workspace_id AS uuid), paper_id, :added_at
+                    FROM unnest(CAST(:paper_ids AS uuid[])) AS paper_id
+                    ON CONFLICT (workspace_id, paper_id) DO NOTHING
+                """),
+                {"workspace_id": bulk_import.workspace_id, "paper_ids": paper_ids, "added_at": datetime.utcnow()}
+            )
+        conn.commit()
+
+    for row in inserted:
+        if row.inserted:
+            background_tasks.add_task(update_paper_neighbors, str(row.id))
+
+    if bulk_import.workspace_id:
+        invalidate_workspace_context(bulk_import.workspace_id)
+        invalidate_workspace_index(bulk_import.workspace_id)
+        for row in existing:
+            if row.summary is None:
+                background_tasks.add_task(generate_paper_summary, str(row.id))
+        for row in inserted:
+            background_tasks.add_task(generate_paper_summary, str(row.id))
+
+    fetched_bases = {base_arxiv_id(paper.arxiv_id) for paper in fetched if paper.arxiv_id}
+
+    return ArxivBulkImportResponse(
+        imported=[
+            PaperResponse(
+                id=str(paper.id),
+                title=paper.title,
+                authors=paper.authors,
+                abstract=paper.abstract,
+                publication_date=paper.publication_date,
+                pdf_url=paper.pdf_url,
+                arxiv_id=paper.arxiv_id,
+                doi=paper.doi,
+                created_at=paper.created_at
+            )
+            for paper in inserted
+        ],
+        skipped=[requested[base_id] for base_id in requested if base_id in existing_bases],
+        not_found=invalid + [requested[base_id] for base_id in missing if base_id not in fetched_bases]
+    )
+
+@router.post("/search/hybrid", response_model=List[PaperResponse], dependencies=[Depends(rate_limited("search"))])
+@query_budget(statements=3)
+async def hybrid_search_papers(
+    search_query: HybridSearchQuery,
+    current_user: str = Depends(get_current_user)
+):
+    limit = search_query.limit
+    candidates = max(limit * 4, HYBRID_MIN_CANDIDATES)
+    query_embedding = await run_in_threadpool(generate_embedding, search_query.query)
+    params = {
+        "query": search_query.query,
+        "embedding": str(query_embedding),
+        "candidates": candidates,
+        "rrf_k": RRF_K,
+        "limit": limit,
+        **vector_search_params()
+    }
+
+    scope_join = ""
+    if search_query.workspace_id:
+        scope_join = "JOIN workspace_papers wp ON wp.paper_id = p.id AND wp.workspace_id = :workspace_id"
+        params["workspace_id"] = search_query.workspace_id
+    nearest = nearest_papers_sql("CAST(:embedding AS vector)", ":candidates", join=scope_join)
+
+    with read_connection() as conn:
+        if search_query.workspace_id:
+            workspace = conn.execute(
+                text("SELECT id FROM workspaces WHERE id = :workspace_id AND user_id = :user_id"),
+                {"workspace_id": search_query.workspace_id, "user_id": current_user}
+            ).fetchone()
+
+            if not workspace:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Workspace not found"
+                )
+
+        prepare_vector_search(conn, candidates)
+        result = conn.execute(
+            text(f"""
+                WITH fts AS (
+                    SELECT id, row_number() OVER (ORDER BY score DESC) AS rank
+                    FROM (
+                        SELECT p.id, ts_rank_cd(p.search_vector, q.query) AS score
+                        FROM papers p
+                        CROSS JOIN websearch_to_tsquery('english', :query) AS q(query)
+                        {scope_join}
+                        WHERE p.search_vector @@ q.query
+                        ORDER BY score DESC
+                        LIMIT :candidates
+                    ) matches
+                ),
+                vec AS (
+                    SELECT id, row_number() OVER (ORDER BY distance) AS rank
+                    FROM ({nearest}) nearest
+                )
+                SELECT p.id, p.title, p.authors, p.abstract, p.publication_date,
+                       p.pdf_url, p.arxiv_id, p.doi, p.created_at
+                FROM (
+                    SELECT id, rank FROM fts
+                    UNION ALL
+                    SELECT id, rank FROM vec
+                ) r
+                JOIN papers p ON p.id = r.id
+                GROUP BY p.id
+                ORDER BY SUM(1.0 / (:rrf_k + r.rank)) DESC
+                LIMIT :limit
+            """),
+            params
         )
 
+        return rows_response(result, PaperResponse)
+
 @router.post("/import", status_code=status.HTTP_201_CREATED)
+@query_budget(statements=3)
 async def import_paper(
     paper_import: PaperImport,
+    background_tasks: BackgroundTasks,
     current_user: str = Depends(get_current_user)
 ):
     with engine.connect() as conn:
@@ -132,7 +312,7 @@ async def import_paper(
             )
 
         paper = conn.execute(
-            text("SELECT id FROM papers WHERE id = :paper_id"),
+            text("SELECT id, summary FROM papers WHERE id = :paper_id"),
             {"paper_id": paper_import.paper_id}
         ).fetchone()
 
@@ -155,6 +335,8 @@ async def import_paper(
                 }
             )
             conn.commit()
+            invalidate_workspace_context(paper_import.workspace_id)
+            invalidate_workspace_index(paper_import.workspace_id)
         except Exception as e:
             if "unique" in str(e).lower():
                 raise HTTPException(
@@ -163,16 +345,30 @@ async def import_paper(
                 )
             raise e
 
+        if paper.summary is None:
+            background_tasks.add_task(generate_paper_summary, paper_import.paper_id)
+
         return {"message": "Paper imported successfully"}
 
 @router.get("/workspace/{workspace_id}", response_model=List[PaperResponse])
+@query_budget(statements=2)
 async def get_workspace_papers(
     workspace_id: str,
+    request: Request,
     current_user: str = Depends(get_current_user)
 ):
-    with engine.connect() as conn:
+    with read_connection() as conn:
         workspace = conn.execute(
-            text("SELECT id FROM workspaces WHERE id = :workspace_id AND user_id = :user_id"),
+            text("""
+                SELECT w.id, v.total, v.version
+                FROM workspaces w
+                CROSS JOIN LATERAL (
+                    SELECT count(*) AS total, max(added_at) AS version
+                    FROM workspace_papers
+                    WHERE workspace_id = w.id
+                ) v
+                WHERE w.id = :workspace_id AND w.user_id = :user_id
+            """),
             {"workspace_id": workspace_id, "user_id": current_user}
         ).fetchone()
 
@@ -182,6 +378,10 @@ async def get_workspace_papers(
                 detail="Workspace not found"
             )
 
+        etag = make_etag("workspace_papers", current_user, workspace_id, workspace.total, workspace.version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         result = conn.execute(
             text("""
                 SELECT p.id, p.title, p.authors, p.abstract, p.publication_date,
@@ -193,25 +393,232 @@ async def get_workspace_papers(
             """),
             {"workspace_id": workspace_id}
         )
-        papers = result.fetchall()
 
-        return [
-            PaperResponse(
-                id=str(paper.id),
-                title=paper.title,
-                authors=paper.authors,
-                abstract=paper.abstract,
-                publication_date=paper.publication_date,
-                pdf_url=paper.pdf_url,
-                arxiv_id=paper.arxiv_id,
-                doi=paper.doi,
-                created_at=paper.created_at
+        return rows_response(result, PaperResponse, headers=etag_headers(etag))
+
+@router.get("/{paper_id}/related", response_model=List[RelatedPaperResponse])
+@query_budget(statements=3)
+async def get_related_papers(
+    paper_id: str,
+    workspace_id: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=settings.related_papers_k),
+    current_user: str = Depends(get_current_user)
+):
+    with read_connection() as conn:
+        # Paper and workspace ownership are checked in one round trip, along
+        # with what the workspace scope needs to rank against its index.
+        found = conn.execute(
+            text("""
+                SELECT p.id, CASE WHEN p.embedding_model = :embedding_model
+                            THEN CAST(p.embedding AS text) END AS embedding,
+                       w.id AS workspace_id, v.total, v.version
+                FROM papers p
+                LEFT JOIN workspaces w
+                    ON w.id = CAST(:workspace_id AS uuid) AND w.user_id = :user_id
+                LEFT JOIN LATERAL (
+                    SELECT count(*) AS total, max(added_at) AS version
+                    FROM workspace_papers
+                    WHERE workspace_id = w.id
+                ) v ON w.id IS NOT NULL
+                WHERE p.id = :paper_id
+            """),
+            {
+                "paper_id": paper_id,
+                "workspace_id": workspace_id,
+                "user_id": current_user,
+                "embedding_model": settings.embedding_model_name
+            }
+        ).fetchone()
+
+        if not found:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Paper not found"
+            )
+
+        if not workspace_id:
+            result = conn.execute(
+                text("""
+                    SELECT p.id, p.title, p.authors, p.abstract, p.publication_date,
+                           p.pdf_url, p.arxiv_id, p.doi, p.created_at, n.similarity
+                    FROM paper_neighbors n
+                    JOIN papers p ON p.id = n.neighbor_id
+                    WHERE n.paper_id = :paper_id
+                    ORDER BY n.similarity DESC
+                    LIMIT :limit
+                """),
+                {"paper_id": paper_id, "limit": limit}
+            )
+            return rows_response(result, RelatedPaperResponse)
+
+        if found.workspace_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Workspace not found"
+            )
+
+        # The precomputed lists only hold the global top-k, so filtering them
+        # to a workspace can come back short or empty; rank against the
+        # workspace's own index instead.
+        if found.embedding is None:
+            return []
+
+        index = get_workspace_index(conn, workspace_id, (found.total, found.version))
+        ranked = [
+            (neighbor_id, similarity)
+            for neighbor_id, similarity in index.top_k(parse_embedding(found.embedding), limit + 1)
+            if neighbor_id != str(found.id)
+        ][:limit]
+        if not ranked:
+            return []
+
+        result = conn.execute(
+            text("""
+                SELECT p.id, p.title, p.authors, p.abstract, p.publication_date,
+                       p.pdf_url, p.arxiv_id, p.doi, p.created_at, r.similarity
+                FROM unnest(CAST(:ids AS uuid[]), CAST(:similarities AS real[])) AS r(id, similarity)
+                JOIN papers p ON p.id = r.id
+                ORDER BY r.similarity DESC
+            """),
+            {
+                "ids": [neighbor_id for neighbor_id, _ in ranked],
+                "similarities": [similarity for _, similarity in ranked]
+            }
+        )
+
+        return rows_response(result, RelatedPaperResponse)
+
+@router.post("/workspace/{workspace_id}/rank", response_model=List[RelatedPaperResponse])
+@query_budget(statements=3)
+async def rank_workspace_papers(
+    workspace_id: str,
+    search_query: SearchQuery,
+    current_user: str = Depends(get_current_user)
+):
+    query_embedding = await run_in_threadpool(generate_embedding, search_query.query)
+
+    with read_connection() as conn:
+        workspace = conn.execute(
+            text("""
+                SELECT w.id, v.total, v.version
+                FROM workspaces w
+                CROSS JOIN LATERAL (
+                    SELECT count(*) AS total, max(added_at) AS version
+                    FROM workspace_papers
+                    WHERE workspace_id = w.id
+                ) v
+                WHERE w.id = :workspace_id AND w.user_id = :user_id
+            """),
+            {"workspace_id": workspace_id, "user_id": current_user}
+        ).fetchone()
+
+        if not workspace:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Workspace not found"
             )
-            for paper in papers
-        ]
 
-@router.post("/upload", response_model=PaperResponse)
+        index = get_workspace_index(conn, workspace_id, (workspace.total, workspace.version))
+        ranked = index.top_k(query_embedding, search_query.limit)
+        if not ranked:
+            return []
+
+        result = conn.execute(
+            text("""
+                SELECT p.id, p.title, p.authors, p.abstract, p.publication_date,
+                       p.pdf_url, p.arxiv_id, p.doi, p.created_at, r.similarity
+                FROM unnest(CAST(:ids AS uuid[]), CAST(:similarities AS real[])) AS r(id, similarity)
+                JOIN papers p ON p.id = r.id
+                ORDER BY r.similarity DESC
+            """),
+            {
+                "ids": [paper_id for paper_id, _ in ranked],
+                "similarities": [similarity for _, similarity in ranked]
+            }
+        )
+
+        return rows_response(result, RelatedPaperResponse)
+
+def paper_response(paper) -> PaperResponse:
+    return PaperResponse(
+        id=str(paper.id),
+        title=paper.title,
+        authors=paper.authors,
+        abstract=paper.abstract,
+        publication_date=paper.publication_date,
+        pdf_url=paper.pdf_url,
+        arxiv_id=paper.arxiv_id,
+        doi=paper.doi,
+        created_at=paper.created_at
+    )
+
+def find_paper_by_hash(conn, content_hash: str):
+    return conn.execute(
+        text("""
+            SELECT id, title, authors, abstract, publication_date, pdf_url, arxiv_id, doi, created_at
+            FROM papers
+            WHERE content_hash = :content_hash
+        """),
+        {"content_hash": content_hash}
+    ).fetchone()
+
+async def ingest_pdf(
+    contents: bytes,
+    content_hash: str,
+    title: str,
+    authors: List[str],
+    background_tasks: BackgroundTasks
+) -> PaperResponse:
+    with engine.connect() as conn:
+        existing = find_paper_by_hash(conn, content_hash)
+
+    if existing:
+        return paper_response(existing)
+
+    extracted_text = await run_in_threadpool(extract_text_from_pdf_bytes, contents)
+    embedding = await run_in_threadpool(generate_embedding, title + " " + extracted_text[:1000])
+
+    with engine.connect() as conn:
+        # A concurrent upload of the same file may have won the race; return its row.
+        result = conn.execute(
+            text("""
+                INSERT INTO papers (title, authors, abstract, content_hash, embedding, embedding_model, created_at)
+                VALUES (:title, :authors, :abstract, :content_hash, :embedding, :embedding_model, :created_at)
+                ON CONFLICT (content_hash) WHERE content_hash IS NOT NULL DO UPDATE
+                SET content_hash = EXCLUDED.content_hash
+                RETURNING id, title, authors, abstract, publication_date, pdf_url, arxiv_id, doi, created_at
+            """),
+            {
+                "title": title,
+                "authors": authors,
+                "abstract": extracted_text[:500],
+                "content_hash": content_hash,
+                "embedding": str(embedding),
+                "embedding_model": settings.embedding_model_name,
+                "created_at": datetime.utcnow()
+            }
+        )
+        paper = result.fetchone()
+
+        conn.execute(
+            text("""
+                INSERT INTO paper_texts (paper_id, pdf_text, created_at)
+                VALUES (:paper_id, :pdf_text, :created_at)
+                ON CONFLICT (paper_id) DO NOTHING
+            """),
+            {"paper_id": paper.id, "pdf_text": extracted_text, "created_at": datetime.utcnow()}
+        )
+        conn.commit()
+
+    background_tasks.add_task(generate_paper_summary, str(paper.id))
+    background_tasks.add_task(update_paper_neighbors, str(paper.id))
+
+    return paper_response(paper)
+
+@router.post("/upload", response_model=PaperResponse, dependencies=[Depends(rate_limited("upload"))])
+@query_budget(statements=3, connections=2)
 async def upload_paper(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     title: str = "",
     authors: str = "",
@@ -225,50 +632,239 @@ async def upload_paper(
 
     try:
         contents = await file.read()
-        extracted_text = extract_text_from_pdf_bytes(contents)
-
         authors_list = [a.strip() for a in authors.split(",")] if authors else []
+        return await ingest_pdf(
+            contents, compute_content_hash(contents), title or file.filename, authors_list, background_tasks
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing PDF: {str(e)}"
+        )
 
-        embedding = generate_embedding(title + " " + extracted_text[:1000])
+def get_upload_session(conn, upload_id: str, user_id: str):
+    upload = conn.execute(
+        text("""
+            SELECT id, filename, title, authors, size, sha256, expires_at
+            FROM upload_sessions
+            WHERE id = :upload_id AND user_id = :user_id AND expires_at > now()
+        """),
+        {"upload_id": upload_id, "user_id": user_id}
+    ).fetchone()
+
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
 
-        with engine.connect() as conn:
-            result = conn.execute(
-                text("""
-                    INSERT INTO papers (title, authors, abstract, pdf_text, embedding, created_at)
-                    VALUES (:title, :authors, :abstract, :pdf_text, :embedding, :created_at)
-                    RETURNING id, title, authors, abstract, publication_date, pdf_url, arxiv_id, doi, created_at
-                """),
-                {
-                    "title": title or file.filename,
-                    "authors": authors_list,
-                    "abstract": extracted_text[:500],
-                    "pdf_text": extracted_text,
-                    "embedding": str(embedding),
-                    "created_at": datetime.utcnow()
-                }
+    return upload
+
+def upload_session_response(upload, offset: int, paper=None) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        id=str(upload.id),
+        filename=upload.filename,
+        size=upload.size,
+        offset=offset,
+        chunk_size=settings.upload_chunk_max_bytes,
+        expires_at=upload.expires_at,
+        paper=paper_response(paper) if paper else None
+    )
+
+@router.post("/uploads", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+@query_budget(statements=3)
+async def create_upload(
+    upload_init: UploadInit,
+    current_user: str = Depends(get_current_user)
+):
+    if not upload_init.filename.endswith('.pdf'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only PDF files are allowed"
+        )
+
+    # Sessions are cheap to open but reserve disk, so they are rate limited
+    # without taking an admission slot.
+    check_rate_limit("upload_session", current_user)
+
+    if not 0 < upload_init.size <= settings.max_upload_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File size must be between 1 and {settings.max_upload_bytes} bytes"
+        )
+
+    sha256 = upload_init.sha256.lower()
+    if not SHA256_PATTERN.match(sha256):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="sha256 must be a hex-encoded SHA-256 digest"
+        )
+
+    with engine.connect() as conn:
+        expired = conn.execute(
+            text("DELETE FROM upload_sessions WHERE expires_at <= now() RETURNING id")
+        ).fetchall()
+
+        # When the file is already stored the response carries the paper, so
+        # the client can complete the upload without sending any bytes.
+        existing = find_paper_by_hash(conn, sha256)
+
+        # The per-user caps on open sessions and reserved bytes are checked
+        # by the insert itself; no row back means a cap was hit.
+        upload = conn.execute(
+            text("""
+                INSERT INTO upload_sessions (user_id, filename, title, authors, size, sha256, expires_at)
+                SELECT :user_id, :filename, :title, :authors, :size, :sha256,
+                       now() + make_interval(secs => :ttl_seconds)
+                FROM (
+                    SELECT count(*) AS open_uploads, COALESCE(sum(size), 0) AS open_bytes
+                    FROM upload_sessions
+                    WHERE user_id = :user_id
+                ) open
+                WHERE open.open_uploads < :max_uploads AND open.open_bytes + :size <= :max_bytes
+                RETURNING id, filename, title, authors, size, sha256, expires_at
+            """),
+            {
+                "user_id": current_user,
+                "filename": upload_init.filename,
+                "title": upload_init.title,
+                "authors": [a.strip() for a in upload_init.authors if a.strip()],
+                "size": upload_init.size,
+                "sha256": sha256,
+                "ttl_seconds": settings.upload_session_ttl_hours * 3600,
+                "max_uploads": settings.max_open_uploads_per_user,
+                "max_bytes": settings.max_open_upload_bytes_per_user
+            }
+        ).fetchone()
+        conn.commit()
+
+    for row in expired:
+        discard_upload(str(row.id))
+
+    if upload is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=(
+                f"At most {settings.max_open_uploads_per_user} uploads and "
+                f"{settings.max_open_upload_bytes_per_user} bytes in progress; complete or cancel one first"
             )
+        )
+
+    return upload_session_response(upload, 0, existing)
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+@query_budget(statements=1)
+async def get_upload(
+    upload_id: str,
+    current_user: str = Depends(get_current_user)
+):
+    with engine.connect() as conn:
+        upload = get_upload_session(conn, upload_id, current_user)
+
+    return upload_session_response(upload, received_bytes(upload_id))
+
+@router.put("/uploads/{upload_id}", response_model=UploadSessionResponse)
+@query_budget(statements=1)
+async def upload_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    current_user: str = Depends(get_current_user)
+):
+    check_rate_limit("upload_chunk", current_user)
+
+    with engine.connect() as conn:
+        upload = get_upload_session(conn, upload_id, current_user)
+
+    if not 0 <= offset <= upload.size:
+        current = received_bytes(upload_id)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Offset {offset} is outside the {upload.size} byte upload, which is at offset {current}",
+            headers={"Upload-Offset": str(current)}
+        )
+
+    max_bytes = min(settings.upload_chunk_max_bytes, upload.size - offset)
+    new_offset = await write_chunk(upload_id, offset, request.stream(), max_bytes)
+
+    return upload_session_response(upload, new_offset)
+
+@router.post(
+    "/uploads/{upload_id}/complete",
+    response_model=PaperResponse,
+    dependencies=[Depends(rate_limited("upload"))]
+)
+@query_budget(statements=6, connections=4)
+async def complete_upload(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: str = Depends(get_current_user)
+):
+    with engine.connect() as conn:
+        upload = get_upload_session(conn, upload_id, current_user)
+        # A file that is already stored is not read or hashed again, however
+        # many of its bytes were sent.
+        existing = find_paper_by_hash(conn, upload.sha256)
+        if existing:
+            conn.execute(text("DELETE FROM upload_sessions WHERE id = :upload_id"), {"upload_id": upload_id})
             conn.commit()
-            paper = result.fetchone()
 
-            return PaperResponse(
-                id=str(paper.id),
-                title=paper.title,
-                authors=paper.authors,
-                abstract=paper.abstract,
-                publication_date=paper.publication_date,
-                pdf_url=paper.pdf_url,
-                arxiv_id=paper.arxiv_id,
-                doi=paper.doi,
-                created_at=paper.created_at
-            )
+    if existing:
+        discard_upload(upload_id)
+        return paper_response(existing)
+
+    received = received_bytes(upload_id)
+    if received != upload.size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload incomplete: received {received} of {upload.size} bytes",
+            headers={"Upload-Offset": str(received)}
+        )
 
+    content_hash = await run_in_threadpool(file_sha256, upload_path(upload_id))
+    if content_hash != upload.sha256:
+        # The bytes on disk cannot be trusted; the client has to send the file again.
+        discard_upload(upload_id)
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Checksum mismatch, upload the file again",
+            headers={"Upload-Offset": "0"}
+        )
+
+    try:
+        contents = await run_in_threadpool(read_upload, upload_id)
+        paper = await ingest_pdf(
+            contents, content_hash, upload.title or upload.filename, upload.authors, background_tasks
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing PDF: {str(e)}"
         )
 
+    with engine.connect() as conn:
+        conn.execute(text("DELETE FROM upload_sessions WHERE id = :upload_id"), {"upload_id": upload_id})
+        conn.commit()
+    discard_upload(upload_id)
+
+    return paper
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(statements=2)
+async def cancel_upload(
+    upload_id: str,
+    current_user: str = Depends(get_current_user)
+):
+    with engine.connect() as conn:
+        get_upload_session(conn, upload_id, current_user)
+        conn.execute(text("DELETE FROM upload_sessions WHERE id = :upload_id"), {"upload_id": upload_id})
+        conn.commit()
+    discard_upload(upload_id)
+
+    return None
+
 @router.delete("/workspace/{workspace_id}/paper/{paper_id}", status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(statements=2)
 async def remove_paper_from_workspace(
     workspace_id: str,
     paper_id: str,
@@ -291,6 +887,8 @@ async def remove_paper_from_workspace(
             {"workspace_id": workspace_id, "paper_id": paper_id}
         )
         conn.commit()
+        invalidate_workspace_context(workspace_id)
+        invalidate_workspace_index(workspace_id)
 
         if result.rowcount == 0:
             raise HTTPException(
@@ -1,14 +1,31 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from models.schemas import WorkspaceCreate, WorkspaceUpdate, WorkspaceResponse
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from models.schemas import (
+    WorkspaceCreate, WorkspaceUpdate, WorkspaceResponse, WorkspaceOverview, WorkspaceImportResponse
+)
+from utils.query_stats import query_budget
 from utils.auth import get_current_user
-from database import engine
+from utils.rate_limit import rate_limited
+from utils.serialization import rows_response, json_body_response
+from utils.etag import make_etag, etag_matches, etag_headers, not_modified
+from utils.workspace_context import invalidate_workspace_context
+from utils.vector_index import invalidate_workspace_index
+from utils.workspace_transfer import iter_workspace_export, import_workspace_file
+from utils.neighbors import update_paper_neighbors
+from database import engine, read_connection
+from config import get_settings
 from sqlalchemy import text
 from typing import List
 from datetime import datetime
+import tempfile
+
+settings = get_settings()
 
 router = APIRouter(prefix="/workspaces", tags=["Workspaces"])
 
 @router.post("", response_model=WorkspaceResponse, status_code=status.HTTP_201_CREATED)
+@query_budget(statements=1)
 async def create_workspace(
     workspace_data: WorkspaceCreate,
     current_user: str = Depends(get_current_user)
@@ -41,8 +58,22 @@ async def create_workspace(
         )
 
 @router.get("", response_model=List[WorkspaceResponse])
-async def get_workspaces(current_user: str = Depends(get_current_user)):
-    with engine.connect() as conn:
+@query_budget(statements=2)
+async def get_workspaces(request: Request, current_user: str = Depends(get_current_user)):
+    with read_connection() as conn:
+        marker = conn.execute(
+            text("""
+                SELECT count(*) AS total, max(updated_at) AS version
+                FROM workspaces
+                WHERE user_id = :user_id
+            """),
+            {"user_id": current_user}
+        ).fetchone()
+
+        etag = make_etag("workspaces", current_user, marker.total, marker.version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         result = conn.execute(
             text("""
                 SELECT id, user_id, name, description, created_at, updated_at
@@ -52,26 +83,167 @@ async def get_workspaces(current_user: str = Depends(get_current_user)):
             """),
             {"user_id": current_user}
         )
-        workspaces = result.fetchall()
-
-        return [
-            WorkspaceResponse(
-                id=str(ws.id),
-                user_id=str(ws.user_id),
-                name=ws.name,
-                description=ws.description,
-                created_at=ws.created_at,
-                updated_at=ws.updated_at
-            )
-            for ws in workspaces
-        ]
+        return rows_response(result, WorkspaceResponse, headers=etag_headers(etag))
+
+@router.post("/import", response_model=WorkspaceImportResponse, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(rate_limited("upload"))])
+# Per batch: statements grow with the import, by up to 4 for each further
+# IMPORT_BATCH_SIZE papers and 2 for each further batch of messages.
+@query_budget(statements=8)
+async def import_workspace(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    current_user: str = Depends(get_current_user)
+):
+    # The whole body is received (spilling to disk past IMPORT_SPOOL_BYTES)
+    # before a connection is checked out, so a slow client never holds one.
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Imports are limited to {settings.import_max_bytes} bytes"
+    )
+    if int(request.headers.get("content-length") or 0) > settings.import_max_bytes:
+        raise too_large
+
+    with tempfile.SpooledTemporaryFile(max_size=settings.import_spool_bytes) as body:
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > settings.import_max_bytes:
+                raise too_large
+            body.write(chunk)
+        body.seek(0)
+        importer = await run_in_threadpool(import_workspace_file, body, current_user)
+
+    for paper_id in importer.inserted_paper_ids:
+        background_tasks.add_task(update_paper_neighbors, paper_id)
+
+    workspace = importer.workspace
+    return WorkspaceImportResponse(
+        workspace=WorkspaceResponse(
+            id=str(workspace.id),
+            user_id=str(workspace.user_id),
+            name=workspace.name,
+            description=workspace.description,
+            created_at=workspace.created_at,
+            updated_at=workspace.updated_at
+        ),
+        papers=importer.counts["paper"],
+        conversations=importer.counts["conversation"],
+        messages=importer.counts["message"]
+    )
+
+@router.get("/{workspace_id}/overview", response_model=WorkspaceOverview)
+@query_budget(statements=1)
+async def get_workspace_overview(
+    workspace_id: str,
+    papers_limit: int = Query(50, ge=1, le=200),
+    conversations_limit: int = Query(20, ge=1, le=200),
+    current_user: str = Depends(get_current_user)
+):
+    # Everything the workspace page needs, assembled by Postgres as one JSON
+    # document in one round trip, then validated against WorkspaceOverview.
+    with read_connection() as conn:
+        overview = conn.execute(
+            text("""
+                SELECT CAST(json_build_object(
+                    'workspace', json_build_object(
+                        'id', w.id,
+                        'user_id', w.user_id,
+                        'name', w.name,
+                        'description', w.description,
+                        'created_at', w.created_at,
+                        'updated_at', w.updated_at
+                    ),
+                    'paper_count', (SELECT count(*) FROM workspace_papers WHERE workspace_id = w.id),
+                    'conversation_count', (SELECT count(*) FROM conversations WHERE workspace_id = w.id),
+                    'papers', COALESCE((
+                        SELECT json_agg(json_build_object(
+                            'id', p.id,
+                            'title', p.title,
+                            'authors', p.authors,
+                            'abstract', p.abstract,
+                            'publication_date', p.publication_date,
+                            'pdf_url', p.pdf_url,
+                            'arxiv_id', p.arxiv_id,
+                            'doi', p.doi,
+                            'created_at', p.created_at
+                        ) ORDER BY p.added_at DESC)
+                        FROM (
+                            SELECT p.*, wp.added_at
+                            FROM workspace_papers wp
+                            JOIN papers p ON p.id = wp.paper_id
+                            WHERE wp.workspace_id = w.id
+                            ORDER BY wp.added_at DESC
+                            LIMIT :papers_limit
+                        ) p
+                    ), CAST('[]' AS json)),
+                    'conversations', COALESCE((
+                        SELECT json_agg(json_build_object(
+                            'id', c.id,
+                            'workspace_id', c.workspace_id,
+                            'title', c.title,
+                            'created_at', c.created_at,
+                            'updated_at', c.updated_at
+                        ) ORDER BY c.updated_at DESC)
+                        FROM (
+                            SELECT id, workspace_id, title, created_at, updated_at
+                            FROM conversations
+                            WHERE workspace_id = w.id
+                            ORDER BY updated_at DESC
+                            LIMIT :conversations_limit
+                        ) c
+                    ), CAST('[]' AS json))
+                ) AS text) AS body
+                FROM workspaces w
+                WHERE w.id = :workspace_id AND w.user_id = :user_id
+            """),
+            {
+                "workspace_id": workspace_id,
+                "user_id": current_user,
+                "papers_limit": papers_limit,
+                "conversations_limit": conversations_limit
+            }
+        ).fetchone()
+
+    if not overview:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Workspace not found"
+        )
+
+    return json_body_response(overview.body, WorkspaceOverview)
+
+@router.get("/{workspace_id}/export")
+@query_budget(statements=1)
+async def export_workspace(
+    workspace_id: str,
+    current_user: str = Depends(get_current_user)
+):
+    with read_connection() as conn:
+        workspace = conn.execute(
+            text("SELECT id FROM workspaces WHERE id = :workspace_id AND user_id = :user_id"),
+            {"workspace_id": workspace_id, "user_id": current_user}
+        ).fetchone()
+
+    if not workspace:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Workspace not found"
+        )
+
+    return StreamingResponse(
+        iter_workspace_export(workspace_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="workspace-{workspace_id}.ndjson"'}
+    )
 
 @router.get("/{workspace_id}", response_model=WorkspaceResponse)
+@query_budget(statements=1)
 async def get_workspace(
     workspace_id: str,
     current_user: str = Depends(get_current_user)
 ):
-    with engine.connect() as conn:
+    with read_connection() as conn:
         result = conn.execute(
             text("""
                 SELECT id, user_id, name, description, created_at, updated_at
@@ -98,6 +270,7 @@ async def get_workspace(
         )
 
 @router.put("/{workspace_id}", response_model=WorkspaceResponse)
+@query_budget(statements=2)
 async def update_workspace(
     workspace_id: str,
     workspace_data: WorkspaceUpdate,
@@ -154,6 +327,7 @@ async def update_workspace(
         )
 
 @router.delete("/{workspace_id}", status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(statements=1)
 async def delete_workspace(
     workspace_id: str,
     current_user: str = Depends(get_current_user)
@@ -164,6 +338,8 @@ async def delete_workspace(
             {"workspace_id": workspace_id, "user_id": current_user}
         )
         conn.commit()
+        invalidate_workspace_context(workspace_id)
+        invalidate_workspace_index(workspace_id)
 
         if result.rowcount == 0:
             raise HTTPException(
@@ -0,0 +1,129 @@
+"""Move old months of `messages` into the `messages_archive` schema.
+
+Each month older than --keep-months is locked and, in one transaction,
+copied into a table in `messages_archive` that stores `content` with lz4 and
+a low toast_tuple_target (so even short messages are compressed); the live
+partition is then detached and dropped and the copy is attached to
+`messages_archive.messages`. Reads of that month wait while it is copied.
+Archived messages remain readable through the `messages_with_archive` view
+(and `GET /chat/conversations/{id}/messages?include_archived=true`).
+
+Also creates upcoming monthly partitions (the API does this too, at startup
+and whenever a chat write finds its month missing).
+
+Run from the backend directory:
+
+    python -m scripts.archive_messages [--keep-months 12] [--dry-run] [--lock-timeout 10s]
+"""
+import argparse
+import re
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from database import engine
+from utils.message_partitions import create_message_partitions
+
+PARTITION_NAME = re.compile(r"^messages_p(\d{4})(\d{2})$")
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def live_partitions(conn):
+    rows = conn.execute(
+        text("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST('public.messages' AS regclass)
+            ORDER BY c.relname
+        """)
+    ).fetchall()
+
+    partitions = []
+    for row in rows:
+        match = PARTITION_NAME.match(row.relname)
+        if match:
+            partitions.append((row.relname, date(int(match.group(1)), int(match.group(2)), 1)))
+    return partitions
+
+
+def archive_partition(name, month, lock_timeout):
+    bounds = {"start": month, "end": add_months(month, 1)}
+
+    # Copy and swap in one transaction, with the partition locked first, so a
+    # row inserted into the month meanwhile (a workspace import can re-create
+    # and fill old months) either lands before the lock and is copied, or
+    # waits and fails once the partition is gone; nothing is dropped unseen.
+    # A month archived earlier is merged into its existing archive table.
+    with engine.connect() as conn:
+        conn.execute(text("SELECT set_config('lock_timeout', :timeout, true)"), {"timeout": lock_timeout})
+        conn.execute(text(f"LOCK TABLE public.{name} IN ACCESS EXCLUSIVE MODE"))
+
+        already_archived = conn.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL"),
+            {"name": f"messages_archive.{name}"}
+        ).scalar()
+        if not already_archived:
+            conn.execute(text(f"""
+                CREATE TABLE messages_archive.{name} (LIKE public.messages INCLUDING DEFAULTS)
+                WITH (toast_tuple_target = 128)
+            """))
+            conn.execute(text(f"ALTER TABLE messages_archive.{name} ALTER COLUMN content SET COMPRESSION lz4"))
+            conn.execute(text(f"ALTER TABLE messages_archive.{name} ENABLE ROW LEVEL SECURITY"))
+        copied = conn.execute(text(f"INSERT INTO messages_archive.{name} SELECT * FROM public.{name}")).rowcount
+
+        conn.execute(text(f"""
+            DELETE FROM messages_archive.{name} a
+            WHERE NOT EXISTS (SELECT 1 FROM conversations c WHERE c.id = a.conversation_id)
+        """))
+        conn.execute(text(f"ALTER TABLE public.messages DETACH PARTITION public.{name}"))
+        if not already_archived:
+            conn.execute(
+                text(f"""
+                    ALTER TABLE messages_archive.messages ATTACH PARTITION messages_archive.{name}
+                    FOR VALUES FROM (CAST(:start AS timestamptz)) TO (CAST(:end AS timestamptz))
+                """),
+                bounds
+            )
+        conn.execute(text(f"DROP TABLE public.{name}"))
+        conn.commit()
+
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old monthly partitions of messages")
+    parser.add_argument("--keep-months", type=int, default=12)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--lock-timeout", default="10s",
+                        help="give up on a month (retry on the next run) rather than wait longer for its locks")
+    args = parser.parse_args()
+
+    this_month = date.today().replace(day=1)
+    cutoff = add_months(this_month, -args.keep_months)
+
+    with engine.connect() as conn:
+        create_message_partitions(conn)
+        partitions = [(name, month) for name, month in live_partitions(conn) if month < cutoff]
+
+    archived = 0
+    for name, month in partitions:
+        if args.dry_run:
+            print(f"would archive {name}")
+            continue
+        try:
+            copied = archive_partition(name, month, args.lock_timeout)
+        except DBAPIError as e:
+            print(f"skipped {name}: {e.orig}")
+            continue
+        archived += 1
+        print(f"archived {name} rows={copied}")
+
+    print(f"archived={archived} cutoff={cutoff.isoformat()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Backfill papers.content_hash for rows created before upload deduplication.
+
+Only the original PDF bytes can be hashed, so rows are backfilled by
+downloading their `pdf_url`. Uploaded papers whose source file was never
+stored keep a NULL hash and are simply not deduplicated against. Downloads
+are spaced ARXIV_MIN_INTERVAL_SECONDS apart, as arXiv asks of API clients.
+
+Run from the backend directory:
+
+    python -m scripts.backfill_content_hashes [--batch-size 50] [--limit N] [--dry-run]
+"""
+import argparse
+import time
+import httpx
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from config import get_settings
+from database import engine
+from utils.pdf_parser import compute_content_hash
+
+settings = get_settings()
+
+
+def fetch_batch(after_id, batch_size):
+    with engine.connect() as conn:
+        return conn.execute(
+            text("""
+                SELECT id, pdf_url FROM papers
+                WHERE content_hash IS NULL
+                AND pdf_url IS NOT NULL
+                AND (CAST(:after_id AS uuid) IS NULL OR id > CAST(:after_id AS uuid))
+                ORDER BY id
+                LIMIT :batch_size
+            """),
+            {"after_id": after_id, "batch_size": batch_size}
+        ).fetchall()
+
+
+def store_hash(paper_id, content_hash):
+    with engine.connect() as conn:
+        try:
+            result = conn.execute(
+                text("""
+                    UPDATE papers SET content_hash = :content_hash
+                    WHERE id = :paper_id
+                    AND NOT EXISTS (SELECT 1 FROM papers WHERE content_hash = :content_hash)
+                """),
+                {"paper_id": paper_id, "content_hash": content_hash}
+            )
+            conn.commit()
+        except IntegrityError:
+            # A concurrent upload stored the same file after the NOT EXISTS check.
+            return False
+        return result.rowcount > 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill papers.content_hash from pdf_url")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many papers")
+    parser.add_argument("--dry-run", action="store_true", help="Hash files without writing")
+    args = parser.parse_args()
+
+    hashed = duplicates = failed = 0
+    after_id = None
+    last_fetch = 0.0
+
+    with httpx.Client(timeout=60.0, follow_redirects=True) as client:
+        while args.limit is None or hashed + duplicates + failed < args.limit:
+            batch_size = args.batch_size
+            if args.limit is not None:
+                batch_size = min(batch_size, args.limit - (hashed + duplicates + failed))
+            rows = fetch_batch(after_id, batch_size)
+            if not rows:
+                break
+
+            for row in rows:
+                after_id = str(row.id)
+                # pdf_url points at arXiv for most papers; keep to its request spacing.
+                wait = last_fetch + settings.arxiv_min_interval_seconds - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                last_fetch = time.monotonic()
+                try:
+                    response = client.get(row.pdf_url)
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    print(f"failed {row.id}: {e}")
+                    failed += 1
+                    continue
+
+                content_hash = compute_content_hash(response.content)
+                if args.dry_run or store_hash(row.id, content_hash):
+                    hashed += 1
+                else:
+                    print(f"duplicate {row.id}: file already stored under another paper")
+                    duplicates += 1
+
+    print(f"hashed={hashed} duplicates={duplicates} failed={failed}")
+
+
+if __name__ == "__main__":
+    main()
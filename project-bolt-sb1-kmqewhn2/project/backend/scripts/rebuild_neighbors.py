@@ -0,0 +1,51 @@
+"""Rebuild precomputed related-paper lists for existing papers.
+
+New papers maintain the lists incrementally at ingest; this is for the initial
+backfill or after changing RELATED_PAPERS_K.
+
+Run from the backend directory:
+
+    python -m scripts.rebuild_neighbors [--batch-size 500]
+"""
+import argparse
+from sqlalchemy import text
+from config import get_settings
+from database import engine
+from utils.neighbors import update_paper_neighbors
+
+settings = get_settings()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild paper_neighbors for all papers")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    processed = 0
+    after_id = None
+
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text("""
+                    SELECT id FROM papers
+                    WHERE embedding IS NOT NULL AND embedding_model = :embedding_model
+                    AND (CAST(:after_id AS uuid) IS NULL OR id > CAST(:after_id AS uuid))
+                    ORDER BY id
+                    LIMIT :batch_size
+                """),
+                {"after_id": after_id, "embedding_model": settings.embedding_model_name, "batch_size": args.batch_size}
+            ).fetchall()
+
+        if not rows:
+            break
+
+        for row in rows:
+            update_paper_neighbors(str(row.id))
+        processed += len(rows)
+        after_id = str(rows[-1].id)
+        print(f"processed={processed}")
+
+
+if __name__ == "__main__":
+    main()
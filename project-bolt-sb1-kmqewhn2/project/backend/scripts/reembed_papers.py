@@ -0,0 +1,125 @@
+"""Re-embed papers whose embedding was produced by another model.
+
+Set EMBEDDING_MODEL_NAME to the new model (the API only uses vectors of that
+model, so search degrades gracefully while this runs), then walk the corpus
+in id order. Each batch is encoded in one call and written with one UPDATE;
+the position is checkpointed per model so an interrupted run resumes where it
+stopped. --target-load keeps the run to that fraction of wall-clock time by
+sleeping between batches in proportion to how long each batch took.
+
+Run from the backend directory:
+
+    python -m scripts.reembed_papers [--batch-size 256] [--target-load 0.5] [--restart] [--limit N]
+
+Afterwards rebuild related-paper lists with `python -m scripts.rebuild_neighbors`.
+"""
+import argparse
+import json
+import time
+from sqlalchemy import text
+from config import get_settings
+from database import engine
+from utils.ai import generate_embeddings
+
+settings = get_settings()
+
+
+def load_checkpoint(model):
+    with engine.connect() as conn:
+        row = conn.execute(
+            text("SELECT last_paper_id, processed FROM embedding_checkpoints WHERE model = :model"),
+            {"model": model}
+        ).fetchone()
+    if row is None:
+        return None, 0
+    return (str(row.last_paper_id) if row.last_paper_id else None), row.processed
+
+
+def fetch_batch(model, after_id, batch_size):
+    # Uploaded papers were embedded from their extracted text, arXiv papers from the abstract.
+    with engine.connect() as conn:
+        return conn.execute(
+            text("""
+                SELECT p.id, p.title || ' ' || COALESCE(left(t.pdf_text, 1000), p.abstract, '') AS content
+                FROM papers p
+                LEFT JOIN paper_texts t ON t.paper_id = p.id
+                WHERE p.embedding_model IS DISTINCT FROM :model
+                AND (CAST(:after_id AS uuid) IS NULL OR p.id > CAST(:after_id AS uuid))
+                ORDER BY p.id
+                LIMIT :batch_size
+            """),
+            {"model": model, "after_id": after_id, "batch_size": batch_size}
+        ).fetchall()
+
+
+def write_batch(model, rows, embeddings, processed):
+    with engine.connect() as conn:
+        conn.execute(
+            text("""
+                UPDATE papers p
+                SET embedding = CAST(r.embedding AS vector), embedding_model = :model
+                FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(id uuid, embedding text)
+                WHERE p.id = r.id
+            """),
+            {
+                "model": model,
+                "rows": json.dumps([
+                    {"id": str(row.id), "embedding": str(embedding)}
+                    for row, embedding in zip(rows, embeddings)
+                ])
+            }
+        )
+        conn.execute(
+            text("""
+                INSERT INTO embedding_checkpoints (model, last_paper_id, processed, updated_at)
+                VALUES (:model, :last_paper_id, :processed, now())
+                ON CONFLICT (model) DO UPDATE
+                SET last_paper_id = EXCLUDED.last_paper_id,
+                    processed = EXCLUDED.processed,
+                    updated_at = EXCLUDED.updated_at
+            """),
+            {"model": model, "last_paper_id": str(rows[-1].id), "processed": processed}
+        )
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed papers with the configured embedding model")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--target-load", type=float, default=1.0,
+                        help="fraction of time spent working (0-1]; the rest is spent sleeping")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    if not 0 < args.target_load <= 1:
+        parser.error("--target-load must be in (0, 1]")
+
+    model = settings.embedding_model_name
+    after_id, processed = (None, 0) if args.restart else load_checkpoint(model)
+    print(f"model={model} resume_after={after_id} processed={processed}")
+
+    done = 0
+    while args.limit is None or done < args.limit:
+        started = time.monotonic()
+        batch_size = args.batch_size if args.limit is None else min(args.batch_size, args.limit - done)
+        rows = fetch_batch(model, after_id, batch_size)
+        if not rows:
+            break
+
+        embeddings = generate_embeddings([row.content for row in rows])
+        processed += len(rows)
+        done += len(rows)
+        write_batch(model, rows, embeddings, processed)
+        after_id = str(rows[-1].id)
+
+        busy = time.monotonic() - started
+        print(f"processed={processed} batch_seconds={busy:.2f}")
+        if args.target_load < 1:
+            time.sleep(busy * (1 - args.target_load) / args.target_load)
+
+    print(f"model={model} processed={processed} done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import uuid
+import pytest
+
+# These tests drive the app against a real Postgres with the migrations
+# applied; point TEST_DATABASE_URL at a disposable local database.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ["DATABASE_REPLICA_URLS"] = ""
+    os.environ.setdefault("GROQ_API_KEY", "test")
+    os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    # Query counts are returned as X-DB-* headers in debug mode (test_query_budgets).
+    os.environ["DEBUG"] = "true"
+    os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp(prefix="researchhub-tests-"))
+
+requires_postgres = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def user(client):
+    from sqlalchemy import text
+    from database import engine
+
+    registered = client.post("/auth/register", json={
+        "email": f"test-{uuid.uuid4().hex[:12]}@example.com",
+        "password": "test-password",
+        "full_name": "Test User"
+    }).json()
+    client.headers["Authorization"] = f"Bearer {registered['access_token']}"
+    yield registered["user"]
+
+    with engine.connect() as conn:
+        conn.execute(text("DELETE FROM users WHERE id = :user_id"), {"user_id": registered["user"]["id"]})
+        conn.commit()
+
+@pytest.fixture
+def conversation(client, user):
+    workspace = client.post("/workspaces", json={"name": "Test workspace"}).json()
+    return client.post("/chat/conversations", json={"workspace_id": workspace["id"]}).json()
@@ -0,0 +1,50 @@
+from conftest import requires_postgres
+
+@requires_postgres
+def test_chat_holds_no_connection_while_generating(client, conversation, monkeypatch):
+    import routers.chat
+    from database import engine
+
+    checked_out = []
+
+    def fake_generate_chat_response(messages):
+        checked_out.append(engine.pool.checkedout())
+        return "A generated reply"
+
+    monkeypatch.setattr(routers.chat, "generate_chat_response", fake_generate_chat_response)
+
+    response = client.post("/chat", json={
+        "workspace_id": conversation["workspace_id"],
+        "conversation_id": conversation["id"],
+        "message": "What are these papers about?"
+    })
+
+    assert response.status_code == 200
+    assert response.json()["response"]["content"] == "A generated reply"
+    assert checked_out == [0]
+
+@requires_postgres
+def test_chat_history_is_the_most_recent_messages(client, conversation, monkeypatch):
+    import routers.chat
+
+    prompts = []
+
+    def fake_generate_chat_response(messages):
+        prompts.append(messages)
+        return f"Reply {len(prompts)}"
+
+    monkeypatch.setattr(routers.chat, "generate_chat_response", fake_generate_chat_response)
+
+    for turn in range(1, 8):
+        response = client.post("/chat", json={
+            "workspace_id": conversation["workspace_id"],
+            "conversation_id": conversation["id"],
+            "message": f"Question {turn}"
+        })
+        assert response.status_code == 200
+
+    # The prompt is the system and context messages, the history, then the
+    # new question. Six earlier turns are twelve messages; the last ten start
+    # at turn 2.
+    history = [message["content"] for message in prompts[-1][2:-1]]
+    assert history == [text for turn in range(2, 7) for text in (f"Question {turn}", f"Reply {turn}")]
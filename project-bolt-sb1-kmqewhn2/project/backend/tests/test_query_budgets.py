@@ -0,0 +1,205 @@
+"""Every endpoint's database work against its declared query budget.
+
+Drives the app in-process: registers a throwaway user, uploads two generated
+PDFs, calls each HTTP route and reads the X-DB-* headers, failing if
+statements, connections or round trips exceed the budget of the route it
+hit or a route has no budget. Everything it creates is deleted at the end.
+
+Groq is never called: chat generation and the paper summaries queued by
+uploads and imports are stubbed (TestClient runs background tasks inline).
+The arXiv endpoints need the network and only run with TEST_EXTERNAL=1. The
+WebSocket chat endpoint is not covered, and streamed bodies (the workspace
+export) only count the queries made before streaming starts.
+"""
+import hashlib
+import io
+import os
+import uuid
+import warnings
+import pytest
+from conftest import requires_postgres
+
+EXTERNAL = os.environ.get("TEST_EXTERNAL") == "1"
+
+STATS_HEADERS = {
+    "statements": "x-db-statements",
+    "round_trips": "x-db-round-trips",
+    "rows": "x-db-rows",
+    "connections": "x-db-connections",
+}
+
+def make_pdf():
+    import PyPDF2
+
+    # A blank page with a unique title, so every run uploads a new paper.
+    writer = PyPDF2.PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    writer.add_metadata({"/Title": f"query budget check {uuid.uuid4()}"})
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+def response_stats(response):
+    from utils.query_stats import QueryStats
+
+    stats = QueryStats()
+    for name, header in STATS_HEADERS.items():
+        setattr(stats, name, int(response.headers.get(header, 0)))
+    return stats
+
+class BudgetChecker:
+    def __init__(self, client, app):
+        from fastapi.routing import APIRoute
+
+        self.client = client
+        self.routes = {}
+        self.unbudgeted = []
+        for route in app.routes:
+            if not isinstance(route, APIRoute):
+                continue
+            budget = getattr(route.endpoint, "query_budget", None)
+            for method in route.methods:
+                if budget is None:
+                    self.unbudgeted.append(f"{method} {route.path}")
+                else:
+                    self.routes[(method, route.path)] = budget
+        self.exercised = set()
+        self.skipped = set()
+        self.failures = []
+
+    def call(self, method, route_path, path=None, **kwargs):
+        url = route_path.format(**(path or {}))
+        response = self.client.request(method, url, **kwargs)
+        key = (method, route_path)
+        self.exercised.add(key)
+
+        stats = response_stats(response)
+        budget = self.routes.get(key)
+        problems = budget.violations(stats) if budget is not None else []
+        if response.status_code >= 400:
+            problems.append(f"status {response.status_code}: {response.text[:200]}")
+        if problems:
+            self.failures.append(f"{method} {route_path}: {'; '.join(problems)}")
+        return response
+
+    def skip(self, method, route_path):
+        self.skipped.add((method, route_path))
+
+def run_checks(checker, created):
+    # Records what it creates in `created` as it goes, so cleanup also works after a failure.
+    call = checker.call
+
+    call("GET", "/")
+    call("GET", "/health")
+
+    email = f"query-budget-{uuid.uuid4().hex[:12]}@example.com"
+    registered = call("POST", "/auth/register", json={
+        "email": email, "password": "query-budget", "full_name": "Query Budget"
+    }).json()
+    created["user_id"] = registered["user"]["id"]
+    checker.client.headers["Authorization"] = f"Bearer {registered['access_token']}"
+    call("POST", "/auth/login", json={"email": email, "password": "query-budget"})
+
+    workspace_id = call("POST", "/workspaces", json={"name": "Query budget check"}).json()["id"]
+    ws = {"workspace_id": workspace_id}
+    call("GET", "/workspaces")
+    call("GET", "/workspaces/{workspace_id}", path=ws)
+    call("PUT", "/workspaces/{workspace_id}", path=ws, json={"description": "Checking query budgets"})
+
+    paper = call("POST", "/papers/upload", params={"title": "Query budget check"},
+                 files={"file": ("check.pdf", make_pdf(), "application/pdf")}).json()
+    created["paper_ids"].append(paper["id"])
+
+    contents = make_pdf()
+    digest = hashlib.sha256(contents).hexdigest()
+    upload = call("POST", "/papers/uploads", json={
+        "filename": "chunked.pdf", "size": len(contents), "sha256": digest
+    }).json()
+    up = {"upload_id": upload["id"]}
+    middle = len(contents) // 2
+    call("PUT", "/papers/uploads/{upload_id}", path=up, params={"offset": 0}, content=contents[:middle])
+    call("GET", "/papers/uploads/{upload_id}", path=up)
+    call("PUT", "/papers/uploads/{upload_id}", path=up, params={"offset": middle}, content=contents[middle:])
+    chunked = call("POST", "/papers/uploads/{upload_id}/complete", path=up).json()
+    created["paper_ids"].append(chunked["id"])
+
+    abandoned = call("POST", "/papers/uploads", json={
+        "filename": "abandoned.pdf", "size": len(contents), "sha256": digest
+    }).json()
+    call("DELETE", "/papers/uploads/{upload_id}", path={"upload_id": abandoned["id"]})
+
+    paper_path = {**ws, "paper_id": paper["id"]}
+    call("POST", "/papers/import", json={"workspace_id": workspace_id, "paper_id": paper["id"]})
+    call("POST", "/papers/import", json={"workspace_id": workspace_id, "paper_id": chunked["id"]})
+    call("GET", "/papers/workspace/{workspace_id}", path=ws)
+    call("POST", "/papers/search/hybrid", json={"query": "query budget", "workspace_id": workspace_id})
+    call("POST", "/papers/workspace/{workspace_id}/rank", path=ws, json={"query": "query budget"})
+    call("GET", "/papers/{paper_id}/related", path=paper_path)
+    call("GET", "/papers/{paper_id}/related", path=paper_path, params={"workspace_id": workspace_id})
+    call("GET", "/workspaces/{workspace_id}/overview", path=ws)
+
+    conversation_id = call("POST", "/chat/conversations", json={"workspace_id": workspace_id}).json()["id"]
+    conv = {"conversation_id": conversation_id}
+    call("GET", "/chat/conversations/workspace/{workspace_id}", path=ws)
+    call("GET", "/chat/conversations/{conversation_id}/messages", path=conv)
+    call("POST", "/chat", json={
+        "workspace_id": workspace_id, "conversation_id": conversation_id, "message": "Summarize these papers"
+    })
+
+    if EXTERNAL:
+        call("POST", "/papers/search", json={"query": "query planning", "limit": 5, "prefetch": False})
+        call("POST", "/papers/arxiv/bulk", json={"arxiv_ids": ["1706.03762"], "workspace_id": workspace_id})
+    else:
+        checker.skip("POST", "/papers/search")
+        checker.skip("POST", "/papers/arxiv/bulk")
+
+    # One batch of each record type; the import budget is per batch.
+    export = call("GET", "/workspaces/{workspace_id}/export", path=ws).content
+    imported = call("POST", "/workspaces/import", content=export,
+                    headers={"Content-Type": "application/x-ndjson"}).json()
+
+    call("DELETE", "/papers/workspace/{workspace_id}/paper/{paper_id}", path=paper_path)
+    call("DELETE", "/chat/conversations/{conversation_id}", path=conv)
+    call("DELETE", "/workspaces/{workspace_id}", path={"workspace_id": imported["workspace"]["id"]})
+    call("DELETE", "/workspaces/{workspace_id}", path=ws)
+
+def cleanup(created):
+    from sqlalchemy import text
+    from database import engine
+
+    with engine.connect() as conn:
+        if created["paper_ids"]:
+            conn.execute(
+                text("DELETE FROM papers WHERE id = ANY(CAST(:paper_ids AS uuid[]))"),
+                {"paper_ids": created["paper_ids"]}
+            )
+        if created["user_id"]:
+            conn.execute(text("DELETE FROM users WHERE id = :user_id"), {"user_id": created["user_id"]})
+        conn.commit()
+
+@pytest.fixture
+def stub_groq(monkeypatch):
+    import routers.chat
+    import routers.papers
+
+    monkeypatch.setattr(routers.chat, "generate_chat_response", lambda messages: "A generated reply")
+    monkeypatch.setattr(routers.papers, "generate_paper_summary", lambda paper_id: None)
+
+@requires_postgres
+def test_endpoints_stay_within_query_budgets(client, stub_groq):
+    from main import app
+
+    checker = BudgetChecker(client, app)
+    created = {"user_id": None, "paper_ids": []}
+    try:
+        run_checks(checker, created)
+    finally:
+        cleanup(created)
+
+    for route in checker.unbudgeted:
+        checker.failures.append(f"{route}: no @query_budget declared")
+    unexercised = set(checker.routes) - checker.exercised - checker.skipped
+    if unexercised:
+        warnings.warn(f"not exercised: {', '.join(f'{m} {p}' for m, p in sorted(unexercised))}")
+
+    assert not checker.failures, "\n".join(checker.failures)
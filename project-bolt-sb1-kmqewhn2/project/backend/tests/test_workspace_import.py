@@ -0,0 +1,63 @@
+import orjson
+import pytest
+from conftest import requires_postgres
+
+def ndjson(*records):
+    return b"".join(orjson.dumps({"type": kind, "data": data}) + b"\n" for kind, data in records)
+
+def post_import(client, body):
+    return client.post("/workspaces/import", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+@requires_postgres
+@pytest.mark.parametrize("record", [
+    ("paper", {"id": "not-a-uuid", "title": "Bad id"}),
+    ("paper", {"title": "Short embedding", "embedding": [0.1, 0.2]}),
+    ("paper", {"title": "Bad date", "publication_date": "yesterday"}),
+    ("message", {"conversation_id": "c1", "role": "system", "content": "Not a chat role"}),
+])
+def test_malformed_records_are_rejected(client, user, record):
+    body = ndjson(
+        ("workspace", {"name": "Malformed import"}),
+        ("conversation", {"id": "c1", "title": "Imported"}),
+        record
+    )
+
+    response = post_import(client, body)
+
+    assert response.status_code == 400
+    assert all(ws["name"] != "Malformed import" for ws in client.get("/workspaces").json())
+
+@requires_postgres
+def test_oversized_import_is_rejected(client, user, monkeypatch):
+    from routers.workspaces import settings
+
+    monkeypatch.setattr(settings, "import_max_bytes", 64)
+    body = ndjson(("workspace", {"name": "Too large", "description": "x" * 100}))
+
+    assert post_import(client, body).status_code == 413
+
+@requires_postgres
+def test_new_papers_keep_arxiv_id_and_content_hash(client, user):
+    import hashlib
+    import uuid
+    from sqlalchemy import text
+    from database import engine
+
+    arxiv_id = f"9912.{uuid.uuid4().int % 100000:05d}v1"
+    content_hash = hashlib.sha256(uuid.uuid4().bytes).hexdigest()
+    body = ndjson(
+        ("workspace", {"name": "Round trip"}),
+        ("paper", {"id": str(uuid.uuid4()), "title": "Imported paper", "arxiv_id": arxiv_id,
+                   "content_hash": content_hash})
+    )
+
+    response = post_import(client, body)
+    assert response.status_code == 201
+
+    with engine.connect() as conn:
+        stored = conn.execute(
+            text("DELETE FROM papers WHERE content_hash = :content_hash RETURNING arxiv_id"),
+            {"content_hash": content_hash}
+        ).fetchall()
+        conn.commit()
+    assert [row.arxiv_id for row in stored] == [arxiv_id]
@@ -1,6 +1,7 @@
 from groq import Groq
 from sentence_transformers import SentenceTransformer
 from config import get_settings
+from utils.tracing import traced
 import numpy as np
 
 settings = get_settings()
@@ -11,14 +12,21 @@ embedding_model = None
 def get_embedding_model():
     global embedding_model
     if embedding_model is None:
-        embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        embedding_model = SentenceTransformer(settings.embedding_model_name)
     return embedding_model
 
+@traced("embedding.generate")
 def generate_embedding(text: str) -> list:
     model = get_embedding_model()
     embedding = model.encode(text)
     return embedding.tolist()
 
+@traced("embedding.generate_batch")
+def generate_embeddings(texts: list) -> list:
+    model = get_embedding_model()
+    return model.encode(texts, batch_size=64).tolist()
+
+@traced("llm.chat_completion")
 def generate_chat_response(messages: list, temperature: float = 0.3, max_tokens: int = 2000) -> str:
     try:
         chat_completion = groq_client.chat.completions.create(
@@ -31,6 +39,22 @@ def generate_chat_response(messages: list, temperature: float = 0.3, max_tokens:
     except Exception as e:
         raise Exception(f"Error generating chat response: {str(e)}")
 
+def stream_chat_response(messages: list, temperature: float = 0.3, max_tokens: int = 2000):
+    try:
+        stream = groq_client.chat.completions.create(
+            messages=messages,
+            model="llama-3.3-70b-versatile",
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    except Exception as e:
+        raise Exception(f"Error generating chat response: {str(e)}")
+
 def build_context_from_papers(papers: list) -> str:
     if not papers:
         return "No papers available in the current workspace."
@@ -62,3 +86,45 @@ Always base your responses on the provided papers when relevant. If asked about
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_message}
     ]
+
+def create_paper_summary_prompt(title: str, paper_text: str) -> list:
+    system_prompt = """You are a research assistant writing reference summaries of academic papers.
+Summarize the paper in at most 200 words covering: the problem, the method, the key results and the main limitations.
+Write plain prose without headings."""
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Title: {title}\n\n{paper_text}"}
+    ]
+
+def summarize_paper(title: str, paper_text: str) -> str:
+    return generate_chat_response(create_paper_summary_prompt(title, paper_text), temperature=0.2, max_tokens=400)
+
+def create_map_prompt(paper: dict, question: str) -> list:
+    system_prompt = """You are a research assistant reading one paper from a larger collection.
+Answer the question using only this paper. Be concise and factual.
+If the paper is not relevant to the question, reply with exactly: NOT RELEVANT"""
+
+    authors = ', '.join(paper['authors']) if paper['authors'] else 'Unknown'
+    return [
+        {"role": "system", "content": system_prompt},
+        {
+            "role": "user",
+            "content": f"Title: {paper['title']}\nAuthors: {authors}\nSummary: {paper['summary']}\n\nQuestion: {question}"
+        }
+    ]
+
+def create_reduce_prompt(findings: list, question: str) -> list:
+    notes = ""
+    for i, (paper, answer) in enumerate(findings, 1):
+        notes += f"{i}. {paper['title']}\n   {answer}\n\n"
+
+    system_prompt = f"""You are an intelligent research assistant helping users analyze and understand academic papers.
+Each paper in the user's workspace has already been read individually with the user's question in mind.
+Here are the per-paper findings:
+
+{notes}
+Combine these findings into a single answer. Compare and contrast papers where relevant and refer to them by title.
+Ignore papers marked NOT RELEVANT. If no paper addresses the question, clearly state that."""
+
+    return [{"role": "system", "content": system_prompt}]
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import logging
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Optional
+import httpx
+from sqlalchemy import text
+from config import get_settings
+from models.schemas import PaperCreate
+from utils.cache import LRUCache
+from utils.rate_limit import TokenBucket
+from utils.tracing import span
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ARXIV_API_URL = "http://export.arxiv.org/api/query"
+
+ARXIV_NAMESPACE = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'arxiv': 'http://arxiv.org/schemas/atom'
+}
+
+ENTRY_TAG = "{http://www.w3.org/2005/Atom}entry"
+TOTAL_RESULTS_TAG = "{http://a9.com/-/spec/opensearch/1.1/}totalResults"
+
+ARXIV_VERSION_SUFFIX = re.compile(r"v\d+$")
+ARXIV_ID_PREFIX = re.compile(r"^(?:arxiv:|https?://arxiv\.org/(?:abs|pdf)/)", re.IGNORECASE)
+ARXIV_ID_PATTERN = re.compile(r"^(?:\d{4}\.\d{4,5}|[a-z][a-z.-]*(?:\.[A-Z]{2})?/\d{7})(?:v\d+)?$")
+
+# arXiv asks API clients to space requests out; shared by every background
+# request in this process (bulk imports and page prefetches). Capacity 1 is
+# deliberate: requests start at most once per interval, with no burst, so
+# ARXIV_MAX_CONCURRENCY only lets a slow download overlap the next start.
+arxiv_throttle = TokenBucket(rate=1.0 / settings.arxiv_min_interval_seconds, capacity=1)
+
+search_page_cache = LRUCache(maxsize=settings.arxiv_page_cache_size, ttl=settings.arxiv_page_cache_ttl_seconds)
+_prefetching = {}
+
+class ArxivPage:
+    def __init__(self, papers: list, total: Optional[int], start: int, limit: int):
+        self.papers = papers
+        self.total = total
+        self.start = start
+        self.limit = limit
+
+    @property
+    def next_start(self) -> Optional[int]:
+        next_start = self.start + self.limit
+        if self.total is not None and next_start >= self.total:
+            return None
+        if self.total is None and len(self.papers) < self.limit:
+            return None
+        return next_start
+
+def normalize_arxiv_id(raw_id: str) -> str:
+    arxiv_id = ARXIV_ID_PREFIX.sub("", raw_id.strip())
+    if arxiv_id.endswith(".pdf"):
+        arxiv_id = arxiv_id[:-4]
+    return arxiv_id
+
+def is_valid_arxiv_id(arxiv_id: str) -> bool:
+    return bool(ARXIV_ID_PATTERN.match(arxiv_id))
+
+def base_arxiv_id(arxiv_id: str) -> str:
+    return ARXIV_VERSION_SUFFIX.sub("", arxiv_id)
+
+def parse_arxiv_entry(entry) -> PaperCreate:
+    title_elem = entry.find('atom:title', ARXIV_NAMESPACE)
+    summary_elem = entry.find('atom:summary', ARXIV_NAMESPACE)
+    published_elem = entry.find('atom:published', ARXIV_NAMESPACE)
+    id_elem = entry.find('atom:id', ARXIV_NAMESPACE)
+
+    authors = []
+    for author in entry.findall('atom:author', ARXIV_NAMESPACE):
+        name_elem = author.find('atom:name', ARXIV_NAMESPACE)
+        if name_elem is not None and name_elem.text:
+            authors.append(name_elem.text)
+
+    arxiv_id = id_elem.text.split('/abs/')[-1] if id_elem is not None else None
+
+    return PaperCreate(
+        title=title_elem.text.strip() if title_elem is not None else "Untitled",
+        authors=authors,
+        abstract=summary_elem.text.strip() if summary_elem is not None else "",
+        publication_date=published_elem.text.split('T')[0] if published_elem is not None else None,
+        arxiv_id=arxiv_id,
+        pdf_url=f"https://arxiv.org/pdf/{arxiv_id}.pdf" if arxiv_id else None
+    )
+
+async def wait_for_arxiv_turn() -> None:
+    while True:
+        retry_after = arxiv_throttle.try_acquire()
+        if not retry_after:
+            return
+        await asyncio.sleep(retry_after)
+
+async def parse_arxiv_feed(response: httpx.Response) -> tuple:
+    # Parses entries as the body streams in and clears each one once converted,
+    # so memory stays proportional to one entry rather than the whole feed.
+    parser = ET.XMLPullParser(events=("end",))
+    papers = []
+    total = None
+
+    def drain():
+        nonlocal total
+        for _, elem in parser.read_events():
+            if elem.tag == ENTRY_TAG:
+                # Unknown ids come back as error entries or entries without a title.
+                id_elem = elem.find('atom:id', ARXIV_NAMESPACE)
+                if (elem.find('atom:title', ARXIV_NAMESPACE) is not None and id_elem is not None
+                        and "/api/errors" not in (id_elem.text or "")):
+                    papers.append(parse_arxiv_entry(elem))
+                elem.clear()
+            elif elem.tag == TOTAL_RESULTS_TAG and elem.text:
+                total = int(elem.text)
+
+    async for chunk in response.aiter_bytes():
+        parser.feed(chunk)
+        drain()
+    parser.close()
+    drain()
+
+    return papers, total
+
+async def fetch_arxiv_ids(client: httpx.AsyncClient, arxiv_ids: list) -> list:
+    await wait_for_arxiv_turn()
+    with span("arxiv.id_list", **{"arxiv.ids": len(arxiv_ids)}):
+        async with client.stream(
+            "GET",
+            ARXIV_API_URL,
+            params={"id_list": ",".join(arxiv_ids), "max_results": len(arxiv_ids)},
+            timeout=60.0
+        ) as response:
+            response.raise_for_status()
+            papers, _ = await parse_arxiv_feed(response)
+    return papers
+
+def _page_key(query: str, start: int, limit: int) -> tuple:
+    return (" ".join(query.lower().split()), start, limit)
+
+async def fetch_search_page(client: httpx.AsyncClient, query: str, start: int, limit: int) -> ArxivPage:
+    with span("arxiv.query", **{"arxiv.start": start, "arxiv.max_results": limit}):
+        async with client.stream(
+            "GET",
+            ARXIV_API_URL,
+            params={
+                "search_query": f"all:{query}",
+                "start": start,
+                "max_results": limit
+            },
+            timeout=30.0
+        ) as response:
+            response.raise_for_status()
+            papers, total = await parse_arxiv_feed(response)
+    return ArxivPage(papers, total, start, limit)
+
+async def search_arxiv(query: str, start: int, limit: int) -> ArxivPage:
+    key = _page_key(query, start, limit)
+    page = search_page_cache.get(key)
+    if page is not None:
+        return page
+
+    prefetch = _prefetching.get(key)
+    if prefetch is not None:
+        page = await asyncio.shield(prefetch)
+        if page is not None:
+            return page
+
+    async with httpx.AsyncClient() as client:
+        page = await fetch_search_page(client, query, start, limit)
+    search_page_cache.set(key, page)
+    return page
+
+async def _prefetch_page(query: str, start: int, limit: int) -> Optional[ArxivPage]:
+    try:
+        async with httpx.AsyncClient() as client:
+            page = await fetch_search_page(client, query, start, limit)
+    except (httpx.HTTPError, ET.ParseError) as e:
+        logger.warning("Prefetch of arXiv page failed: %s", e)
+        return None
+    search_page_cache.set(_page_key(query, start, limit), page)
+    return page
+
+def prefetch_arxiv_page(query: str, start: int, limit: int) -> None:
+    key = _page_key(query, start, limit)
+    if search_page_cache.get(key) is not None or key in _prefetching:
+        return
+    # Prefetching is opportunistic: skip it rather than queue behind the throttle.
+    if arxiv_throttle.try_acquire():
+        return
+
+    task = asyncio.create_task(_prefetch_page(query, start, limit))
+    _prefetching[key] = task
+    task.add_done_callback(lambda _: _prefetching.pop(key, None))
+
+async def fetch_many_arxiv_ids(arxiv_ids: list) -> list:
+    batch_size = settings.arxiv_id_batch_size
+    batches = [arxiv_ids[i:i + batch_size] for i in range(0, len(arxiv_ids), batch_size)]
+    semaphore = asyncio.Semaphore(settings.arxiv_max_concurrency)
+
+    async with httpx.AsyncClient() as client:
+        async def fetch_batch(batch):
+            async with semaphore:
+                return await fetch_arxiv_ids(client, batch)
+
+        results = await asyncio.gather(*(fetch_batch(batch) for batch in batches))
+
+    return [paper for batch in results for paper in batch]
+
+def insert_arxiv_papers(conn, papers: list, embeddings: list) -> list:
+    # One round trip for the whole batch; RETURNING order is not guaranteed,
+    # so callers match rows back by arxiv_id.
+    unique = {}
+    for paper, embedding in zip(papers, embeddings):
+        unique.setdefault(paper.arxiv_id, (paper, embedding))
+    if not unique:
+        return []
+
+    now = datetime.utcnow().isoformat()
+    rows = [
+        {
+            "title": paper.title,
+            "authors": paper.authors,
+            "abstract": paper.abstract,
+            "publication_date": paper.publication_date.isoformat() if paper.publication_date else None,
+            "pdf_url": paper.pdf_url,
+            "arxiv_id": paper.arxiv_id,
+            "embedding": str(embedding),
+            "embedding_model": settings.embedding_model_name,
+            "created_at": now
+        }
+        for paper, embedding in unique.values()
+    ]
+
+    return conn.execute(
+        text("""
+            INSERT INTO papers (title, authors, abstract, publication_date, pdf_url, arxiv_id,
+                                embedding, embedding_model, created_at)
+            SELECT r.title, r.authors, r.abstract, r.publication_date, r.pdf_url, r.arxiv_id,
+                   CAST(r.embedding AS vector), r.embedding_model, r.created_at
+            FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(
+                title text, authors text[], abstract text, publication_date date,
+                pdf_url text, arxiv_id text, embedding text, embedding_model text, created_at timestamptz
+            )
+            ON CONFLICT (arxiv_id) WHERE arxiv_id IS NOT NULL DO UPDATE
+            SET title = EXCLUDED.title
+            RETURNING id, title, authors, abstract, publication_date, pdf_url, arxiv_id, doi, created_at,
+                      (xmax = 0) AS inserted
+        """),
+        {"rows": json.dumps(rows)}
+    ).fetchall()
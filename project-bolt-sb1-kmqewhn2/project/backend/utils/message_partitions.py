@@ -0,0 +1,44 @@
+import logging
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from database import engine
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+def create_message_partitions(conn) -> None:
+    # Idempotent: only months without a partition are created.
+    conn.execute(
+        text("SELECT create_messages_partitions(:months_ahead)"),
+        {"months_ahead": settings.message_partition_months_ahead}
+    )
+    conn.commit()
+
+def ensure_message_partitions() -> None:
+    # Called at startup; a database that is down or not migrated yet only
+    # gets a warning, as the write path creates missing months itself.
+    try:
+        with engine.connect() as conn:
+            create_message_partitions(conn)
+    except DBAPIError as e:
+        logger.warning("Could not create message partitions: %s", e)
+
+def _missing_partition(error: DBAPIError) -> bool:
+    # Postgres reports a row outside every partition as a check violation.
+    return getattr(error.orig, "pgcode", None) == "23514" and "no partition" in str(error.orig)
+
+def insert_messages(conn, statement, params: dict):
+    # Executes a statement that inserts into `messages`. When the month has
+    # no partition yet (no pg_cron, and the process has been up longer than
+    # the months created at startup), the partitions are created and the
+    # statement is retried once.
+    try:
+        return conn.execute(statement, params)
+    except DBAPIError as e:
+        if not _missing_partition(e):
+            raise
+        conn.rollback()
+        logger.warning("No messages partition for the current month; creating it")
+        create_message_partitions(conn)
+        return conn.execute(statement, params)
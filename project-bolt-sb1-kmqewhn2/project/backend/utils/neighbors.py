@@ -0,0 +1,92 @@
+import logging
+from sqlalchemy import text
+from config import get_settings
+from database import engine
+from utils.vector_search import nearest_papers_sql, vector_search_params, prepare_vector_search
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+def update_paper_neighbors(paper_id: str) -> None:
+    k = settings.related_papers_k
+    candidate_count = k * settings.related_papers_candidate_factor
+    nearest = nearest_papers_sql(
+        "(SELECT embedding FROM papers WHERE id = :paper_id AND embedding_model = :embedding_model)",
+        ":candidates",
+        where="p.id <> :paper_id"
+    )
+
+    try:
+        with engine.connect() as conn:
+            prepare_vector_search(conn, candidate_count)
+            # The scalar subquery is evaluated once, so the ANN index is used for the scan.
+            candidates = conn.execute(
+                text(f"""
+                    SELECT id, 1 - distance AS similarity
+                    FROM ({nearest}) nearest
+                    WHERE distance IS NOT NULL
+                """),
+                {"paper_id": paper_id, "candidates": candidate_count, **vector_search_params()}
+            ).fetchall()
+
+            conn.execute(
+                text("DELETE FROM paper_neighbors WHERE paper_id = :paper_id"),
+                {"paper_id": paper_id}
+            )
+
+            if not candidates:
+                conn.commit()
+                return
+
+            params = {
+                "paper_id": paper_id,
+                "ids": [str(c.id) for c in candidates],
+                "similarities": [float(c.similarity) for c in candidates],
+                "k": k
+            }
+
+            conn.execute(
+                text("""
+                    INSERT INTO paper_neighbors (paper_id, neighbor_id, similarity)
+                    SELECT CAST(:paper_id AS uuid), c.id, c.similarity
+                    FROM unnest(CAST(:ids AS uuid[]), CAST(:similarities AS real[])) AS c(id, similarity)
+                    ORDER BY c.similarity DESC
+                    LIMIT :k
+                """),
+                params
+            )
+
+            # The new paper enters a candidate's list only if it beats that list's current k-th entry.
+            affected = conn.execute(
+                text("""
+                    INSERT INTO paper_neighbors (paper_id, neighbor_id, similarity)
+                    SELECT c.id, CAST(:paper_id AS uuid), c.similarity
+                    FROM unnest(CAST(:ids AS uuid[]), CAST(:similarities AS real[])) AS c(id, similarity)
+                    WHERE (SELECT count(*) FROM paper_neighbors n WHERE n.paper_id = c.id) < :k
+                    OR c.similarity > (SELECT min(n.similarity) FROM paper_neighbors n WHERE n.paper_id = c.id)
+                    ON CONFLICT (paper_id, neighbor_id) DO UPDATE SET similarity = EXCLUDED.similarity
+                    RETURNING paper_id
+                """),
+                params
+            ).fetchall()
+
+            if affected:
+                conn.execute(
+                    text("""
+                        DELETE FROM paper_neighbors n
+                        USING (
+                            SELECT paper_id, neighbor_id,
+                                   row_number() OVER (PARTITION BY paper_id ORDER BY similarity DESC) AS rank
+                            FROM paper_neighbors
+                            WHERE paper_id = ANY(CAST(:affected AS uuid[]))
+                        ) ranked
+                        WHERE n.paper_id = ranked.paper_id
+                        AND n.neighbor_id = ranked.neighbor_id
+                        AND ranked.rank > :k
+                    """),
+                    {"affected": [str(row.paper_id) for row in affected], "k": k}
+                )
+
+            conn.commit()
+    except Exception:
+        logger.exception("Failed to update neighbours for paper %s", paper_id)
@@ -1,7 +1,13 @@
 import PyPDF2
 from io import BytesIO
+import hashlib
 import httpx
+from utils.tracing import traced
 
+def compute_content_hash(pdf_bytes: bytes) -> str:
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+@traced("pdf.extract_text")
 async def extract_text_from_pdf_url(pdf_url: str) -> str:
     try:
         async with httpx.AsyncClient() as client:
@@ -19,6 +25,7 @@ async def extract_text_from_pdf_url(pdf_url: str) -> str:
     except Exception as e:
         raise Exception(f"Error extracting text from PDF: {str(e)}")
 
+@traced("pdf.extract_text")
 def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
     try:
         pdf_file = BytesIO(pdf_bytes)
@@ -0,0 +1,137 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger("researchhub.query_stats")
+
+class QueryStats:
+    def __init__(self):
+        self.statements = 0
+        self.round_trips = 0
+        self.rows = 0
+        self.connections = 0
+        self.db_time_ms = 0.0
+
+    def headers(self) -> list:
+        return [
+            (b"x-db-statements", str(self.statements).encode()),
+            (b"x-db-round-trips", str(self.round_trips).encode()),
+            (b"x-db-rows", str(self.rows).encode()),
+            (b"x-db-connections", str(self.connections).encode()),
+            (b"x-db-time-ms", f"{self.db_time_ms:.1f}".encode())
+        ]
+
+class QueryBudget:
+    def __init__(self, statements: int, connections: int, round_trips: Optional[int]):
+        self.statements = statements
+        self.connections = connections
+        self.round_trips = round_trips
+
+    def violations(self, stats: QueryStats) -> list:
+        limits = {"statements": self.statements, "connections": self.connections, "round_trips": self.round_trips}
+        return [
+            f"{name} {getattr(stats, name)}>{limit}"
+            for name, limit in limits.items()
+            if limit is not None and getattr(stats, name) > limit
+        ]
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+@contextmanager
+def collect_query_stats():
+    # Threadpool calls copy the context, so work done off the event loop is
+    # counted against the same request.
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+def query_budget(statements: int, connections: int = 1, round_trips: Optional[int] = None):
+    # Declares the most database work one request to the endpoint may do on
+    # its slowest path (cold caches). Checked per request by the middleware
+    # and enforced by tests/test_query_budgets.py.
+    def decorator(fn):
+        fn.query_budget = QueryBudget(statements, connections, round_trips)
+        return fn
+    return decorator
+
+def instrument_query_stats(engine) -> None:
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.connections += 1
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats.get()
+        if stats is None:
+            return
+        stats.statements += len(parameters) if executemany else 1
+        stats.round_trips += 1
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats.get()
+        started = getattr(context, "_query_started", None)
+        if stats is None or started is None:
+            return
+        stats.db_time_ms += (time.perf_counter() - started) * 1000
+        # Rows returned by a SELECT or affected by a write; unknown (-1) for server-side cursors.
+        stats.rows += max(cursor.rowcount, 0)
+
+    @event.listens_for(engine, "commit")
+    def commit(conn):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.round_trips += 1
+
+    @event.listens_for(engine, "rollback")
+    def rollback(conn):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.round_trips += 1
+
+class QueryStatsMiddleware:
+    # Counts are taken when the response headers go out, so streamed bodies
+    # only include the queries made before streaming started.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with collect_query_stats() as stats:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    self._check_budget(scope, stats)
+                    if settings.debug:
+                        message["headers"] = list(message.get("headers", [])) + stats.headers()
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+    def _check_budget(self, scope, stats: QueryStats) -> None:
+        # The router stores the matched endpoint in the scope before calling it.
+        budget = getattr(scope.get("endpoint"), "query_budget", None)
+        if budget is None:
+            return
+        violations = budget.violations(stats)
+        if violations:
+            logger.warning(
+                "Query budget exceeded by %s %s: %s",
+                scope["method"], scope["path"], ", ".join(violations)
+            )
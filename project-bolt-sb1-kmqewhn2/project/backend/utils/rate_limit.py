@@ -0,0 +1,118 @@
+import asyncio
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends, HTTPException, status
+from config import get_settings
+from utils.auth import get_current_user
+from utils.cache import LRUCache
+
+settings = get_settings()
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        # Returns 0 when the tokens were taken, otherwise the seconds until they would be available.
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+class UserRateLimiter:
+    def __init__(self, per_minute: float, burst: int, max_users: int = 10000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self._buckets = LRUCache(maxsize=max_users)
+        self._lock = threading.Lock()
+
+    def check(self, user_id: str) -> float:
+        with self._lock:
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets.set(user_id, bucket)
+        return bucket.try_acquire()
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int, max_queued: int, queue_timeout: float):
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+
+    def _overloaded(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": str(settings.admission_retry_after_seconds)}
+        )
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self._waiting >= self.max_queued:
+            raise self._overloaded()
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._overloaded()
+        finally:
+            self._waiting -= 1
+
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+rate_limiters = {
+    "chat": UserRateLimiter(settings.chat_rate_per_minute, settings.chat_rate_burst),
+    "search": UserRateLimiter(settings.search_rate_per_minute, settings.search_rate_burst),
+    "upload": UserRateLimiter(settings.upload_rate_per_minute, settings.upload_rate_burst),
+    "upload_session": UserRateLimiter(settings.upload_session_rate_per_minute, settings.upload_session_rate_burst),
+    "upload_chunk": UserRateLimiter(settings.upload_chunk_rate_per_minute, settings.upload_chunk_rate_burst),
+}
+
+admission = AdmissionController(
+    max_concurrent=settings.max_concurrent_expensive_requests,
+    max_queued=settings.max_queued_expensive_requests,
+    queue_timeout=settings.admission_queue_timeout_seconds
+)
+
+def check_rate_limit(endpoint_class: str, user_id: str) -> None:
+    if not settings.rate_limit_enabled:
+        return
+    retry_after = rate_limiters[endpoint_class].check(user_id)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+@asynccontextmanager
+async def expensive_slot():
+    if not settings.rate_limit_enabled:
+        yield
+        return
+    async with admission.slot():
+        yield
+
+def rate_limited(endpoint_class: str):
+    async def dependency(current_user: str = Depends(get_current_user)):
+        check_rate_limit(endpoint_class, current_user)
+        async with expensive_slot():
+            yield
+
+    return dependency
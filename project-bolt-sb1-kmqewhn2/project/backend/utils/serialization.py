@@ -0,0 +1,34 @@
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import TypeAdapter
+import orjson
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+class FastJSONResponse(ORJSONResponse):
+    # OPT_UTC_Z keeps datetimes formatted the same way pydantic renders them.
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+@lru_cache(maxsize=None)
+def model_adapter(model) -> TypeAdapter:
+    return TypeAdapter(model)
+
+def rows_to_dicts(rows: Iterable) -> list:
+    return [dict(row._mapping) for row in rows]
+
+def json_body_response(body, model, headers: Optional[dict] = None) -> Response:
+    # For JSON that is already encoded, e.g. assembled by Postgres. The
+    # re-serialization also renders UTC timestamps in the "Z" form.
+    adapter = model_adapter(model)
+    return Response(adapter.dump_json(adapter.validate_json(body)), media_type="application/json", headers=headers)
+
+def rows_response(rows: Iterable, model, headers: Optional[dict] = None) -> Response:
+    # Returning a Response skips FastAPI's response_model handling, so the
+    # rows are validated against `model` here, once for the whole list and
+    # inside pydantic-core: orjson encodes the rows (UUIDs, dates) and the
+    # adapter validates and re-serializes that JSON.
+    return json_body_response(
+        orjson.dumps(rows_to_dicts(rows), option=ORJSON_OPTIONS), List[model], headers=headers
+    )
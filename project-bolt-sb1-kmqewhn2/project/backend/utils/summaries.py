@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from config import get_settings
+from database import engine
+from utils.ai import generate_chat_response, summarize_paper, create_map_prompt, create_reduce_prompt
+from utils.cache import LRUCache
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Per-paper map answers, keyed by paper, summary content and question.
+map_cache = LRUCache(maxsize=settings.map_cache_size)
+
+def generate_paper_summary(paper_id: str) -> None:
+    # Runs as a background task after ingest; no connection is held during the LLM call.
+    with engine.connect() as conn:
+        paper = conn.execute(
+            text("""
+                SELECT p.id, p.title, p.abstract, p.summary, left(t.pdf_text, :max_chars) AS text_head
+                FROM papers p
+                LEFT JOIN paper_texts t ON t.paper_id = p.id
+                WHERE p.id = :paper_id
+            """),
+            {"paper_id": paper_id, "max_chars": settings.summary_input_chars}
+        ).fetchone()
+
+    if not paper or paper.summary:
+        return
+
+    source = paper.text_head or paper.abstract
+    if not source:
+        return
+
+    try:
+        summary = summarize_paper(paper.title, source)
+    except Exception:
+        logger.exception("Failed to summarize paper %s", paper_id)
+        return
+
+    with engine.connect() as conn:
+        conn.execute(
+            text("""
+                UPDATE papers
+                SET summary = :summary, summarized_at = :summarized_at
+                WHERE id = :paper_id AND summary IS NULL
+            """),
+            {"paper_id": paper_id, "summary": summary, "summarized_at": datetime.utcnow()}
+        )
+        conn.commit()
+
+def load_workspace_summaries(conn, workspace_id: str) -> list:
+    # Papers still waiting for their background summary fall back to the abstract.
+    result = conn.execute(
+        text("""
+            SELECT p.id, p.title, p.authors, coalesce(p.summary, p.abstract) AS summary
+            FROM papers p
+            JOIN workspace_papers wp ON p.id = wp.paper_id
+            WHERE wp.workspace_id = :workspace_id
+            ORDER BY wp.added_at
+        """),
+        {"workspace_id": workspace_id}
+    )
+    return [
+        {
+            "id": str(paper.id),
+            "title": paper.title,
+            "authors": paper.authors,
+            "summary": paper.summary or ""
+        }
+        for paper in result
+    ]
+
+def _map_cache_key(paper: dict, question: str) -> tuple:
+    digest = hashlib.sha1(
+        (paper["summary"] + "\0" + " ".join(question.lower().split())).encode("utf-8")
+    ).hexdigest()
+    return (paper["id"], digest)
+
+async def map_reduce_chat_response(papers: list, question: str, history: list) -> str:
+    semaphore = asyncio.Semaphore(settings.map_reduce_concurrency)
+
+    async def map_paper(paper: dict) -> str:
+        key = _map_cache_key(paper, question)
+        cached = map_cache.get(key)
+        if cached is not None:
+            return cached
+
+        async with semaphore:
+            answer = await run_in_threadpool(
+                generate_chat_response, create_map_prompt(paper, question), 0.2, settings.map_max_tokens
+            )
+        map_cache.set(key, answer)
+        return answer
+
+    answers = await asyncio.gather(*(map_paper(paper) for paper in papers))
+
+    messages = create_reduce_prompt(list(zip(papers, answers)), question)
+    messages.extend(history)
+    messages.append({"role": "user", "content": question})
+
+    return await run_in_threadpool(generate_chat_response, messages)
@@ -0,0 +1,320 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger("researchhub.tracing")
+
+SERVICE_NAME = "researchhub-api"
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+class Trace:
+    def __init__(self, request_id: str, background: bool = False):
+        self.request_id = request_id
+        self.trace_id = uuid.uuid4().hex
+        self.attributes = {"request.id": request_id}
+        if background:
+            self.attributes["background"] = True
+        self.spans = []
+        # Set once the response is complete; later spans go there instead.
+        self.followed_by = None
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def current_request_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.request_id if trace else None
+
+def set_trace_attribute(key: str, value) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attributes[key] = value
+
+def _active_trace() -> Optional[Trace]:
+    trace = _current_trace.get()
+    while trace is not None and trace.followed_by is not None:
+        trace = trace.followed_by
+    return trace
+
+@contextmanager
+def span(name: str, **attributes):
+    trace = _active_trace()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    if parent is not None and parent.trace_id != trace.trace_id:
+        parent = None
+    current = Span(name, trace.trace_id, parent.span_id if parent else None, attributes)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = repr(e)
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+def traced(name: str):
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def instrument_engine(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        manager = span("db.query", **{"db.statement": " ".join(statement.split())[:500]})
+        manager.__enter__()
+        context._trace_span = manager
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        manager = getattr(context, "_trace_span", None)
+        if manager is not None:
+            manager.__exit__(None, None, None)
+            context._trace_span = None
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        context = exception_context.execution_context
+        manager = getattr(context, "_trace_span", None) if context is not None else None
+        if manager is not None:
+            exc = exception_context.original_exception
+            manager.__exit__(type(exc), exc, None)
+            context._trace_span = None
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+def to_otlp_json(trace: Trace) -> dict:
+    # OTLP/JSON, one trace per line: readable by the OpenTelemetry Collector's otlpjsonfile receiver.
+    spans = []
+    for s in trace.spans:
+        attributes = dict(s.attributes)
+        if s.parent_id is None:
+            attributes.update(trace.attributes)
+        spans.append({
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "parentSpanId": s.parent_id or "",
+            "name": s.name,
+            "kind": 2 if s.parent_id is None else 1,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns or s.start_ns),
+            "attributes": _otlp_attributes(attributes),
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 0}
+        })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": "researchhub.tracing"}, "spans": spans}]
+        }]
+    }
+
+class _TraceExporter:
+    def __init__(self, path: str):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        threading.Thread(target=self._run, name="trace-exporter", daemon=True).start()
+
+    def export(self, trace: Trace) -> None:
+        self._queue.put(trace)
+
+    def _run(self) -> None:
+        while True:
+            trace = self._queue.get()
+            try:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(to_otlp_json(trace)) + "\n")
+            except OSError:
+                logger.exception("Failed to export trace %s", trace.request_id)
+
+exporter = _TraceExporter(settings.trace_export_path) if settings.trace_export_path else None
+
+def span_breakdown(trace: Trace) -> str:
+    counts = Counter()
+    totals = defaultdict(float)
+    for s in trace.spans:
+        if s.parent_id is None:
+            continue
+        counts[s.name] += 1
+        totals[s.name] += s.duration_ms
+    return ", ".join(
+        f"{name}={totals[name]:.1f}ms/{counts[name]}"
+        for name in sorted(totals, key=totals.get, reverse=True)
+    )
+
+class SamplingProfiler:
+    # Samples every thread's stack (event loop and threadpool), so concurrent
+    # requests show up too; intended for opt-in diagnosis of slow requests.
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write_folded(self, path: str) -> None:
+        # Collapsed-stack format, consumable by flamegraph.pl and speedscope.
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")
+        if not REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        trace = Trace(request_id)
+        trace_token = _current_trace.set(trace)
+
+        profiler = None
+        if settings.profile_slow_requests and random.random() < settings.profile_sample_rate:
+            profiler = SamplingProfiler(settings.profile_interval_ms / 1000.0)
+            profiler.start()
+
+        status_code = 500
+        root = Span(
+            f"{scope['method']} {scope['path']}", trace.trace_id, None,
+            {"http.method": scope["method"], "http.target": scope["path"]}
+        )
+        trace.spans.append(root)
+        span_token = _current_span.set(root)
+
+        def finish_request(error: Optional[BaseException] = None) -> None:
+            # The request ends when its last body chunk is sent. Background
+            # tasks run after that within the same ASGI call; their spans go to
+            # a follow-up trace so they neither count as request time nor
+            # trigger the slow-request log.
+            if root.end_ns is not None:
+                return
+            root.end_ns = time.time_ns()
+            root.attributes["http.status_code"] = status_code
+            if error is not None:
+                root.error = repr(error)
+            trace.followed_by = Trace(request_id, background=True)
+            if profiler is not None:
+                profiler.stop()
+            self._finish(trace, root, profiler)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish_request()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            finish_request(e)
+            raise
+        finally:
+            finish_request()
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            if exporter is not None and trace.followed_by.spans:
+                exporter.export(trace.followed_by)
+
+    def _finish(self, trace: Trace, root: Span, profiler: Optional[SamplingProfiler]) -> None:
+        if exporter is not None:
+            exporter.export(trace)
+
+        if root.duration_ms < settings.slow_request_threshold_ms:
+            return
+
+        logger.warning(
+            "Slow request %s %s took %.1fms [%s]",
+            trace.request_id, root.name, root.duration_ms, span_breakdown(trace)
+        )
+
+        if profiler is not None:
+            try:
+                os.makedirs(settings.profile_dir, exist_ok=True)
+                profiler.write_folded(os.path.join(settings.profile_dir, f"{trace.request_id}.folded"))
+            except OSError:
+                logger.exception("Failed to write profile for request %s", trace.request_id)
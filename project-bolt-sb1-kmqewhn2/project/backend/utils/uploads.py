@@ -0,0 +1,91 @@
+import fcntl
+import hashlib
+import os
+from contextlib import contextmanager
+from typing import AsyncIterator
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from config import get_settings
+
+settings = get_settings()
+
+HASH_BLOCK_SIZE = 2**20
+
+def upload_path(upload_id: str) -> str:
+    return os.path.join(settings.upload_dir, f"{upload_id}.part")
+
+def received_bytes(upload_id: str) -> int:
+    # The part file is the source of truth for the resume offset.
+    try:
+        return os.path.getsize(upload_path(upload_id))
+    except FileNotFoundError:
+        return 0
+
+def discard_upload(upload_id: str) -> None:
+    try:
+        os.remove(upload_path(upload_id))
+    except FileNotFoundError:
+        pass
+
+@contextmanager
+def _locked_part_file(upload_id: str):
+    # flock keeps two workers from writing the same upload at once; the
+    # second request is refused instead of interleaving bytes.
+    os.makedirs(settings.upload_dir, exist_ok=True)
+    fd = os.open(upload_path(upload_id), os.O_WRONLY | os.O_CREAT, 0o600)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Another chunk of this upload is being written"
+            )
+        yield fd
+    finally:
+        os.close(fd)
+
+def _write_at(fd: int, data: bytes, offset: int) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+async def write_chunk(upload_id: str, offset: int, stream: AsyncIterator[bytes], max_bytes: int) -> int:
+    # Streams the request body to disk at `offset` and returns the new offset.
+    # Bytes that arrive before a dropped connection stay written, so the
+    # client resumes from whatever reached the disk.
+    with _locked_part_file(upload_id) as fd:
+        current = os.fstat(fd).st_size
+        if offset != current:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload is at offset {current}, not {offset}",
+                headers={"Upload-Offset": str(current)}
+            )
+
+        async for chunk in stream:
+            if not chunk:
+                continue
+            if offset + len(chunk) - current > max_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Chunk exceeds {max_bytes} bytes",
+                    headers={"Upload-Offset": str(offset)}
+                )
+            await run_in_threadpool(_write_at, fd, chunk, offset)
+            offset += len(chunk)
+
+    return offset
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def read_upload(upload_id: str) -> bytes:
+    with open(upload_path(upload_id), "rb") as f:
+        return f.read()
@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+from sqlalchemy import text
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIMENSIONS = 384
+
+def parse_embedding(value) -> np.ndarray:
+    # Without the pgvector adapter registered, psycopg2 returns vectors as '[x,y,...]' text.
+    if isinstance(value, str):
+        return np.array(json.loads(value), dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+def version_key(version) -> str:
+    total, latest = version
+    return f"{settings.embedding_model_name}:{total}:{latest.isoformat() if latest is not None else ''}"
+
+class WorkspaceVectorIndex:
+    def __init__(self, ids: list, matrix: np.ndarray, version: str):
+        self.ids = ids
+        self.matrix = matrix
+        self.version = version
+
+    @classmethod
+    def from_rows(cls, rows, version: str) -> "WorkspaceVectorIndex":
+        ids = [str(row.id) for row in rows]
+        if ids:
+            matrix = np.ascontiguousarray(np.stack([parse_embedding(row.embedding) for row in rows]))
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+        else:
+            matrix = np.empty((0, EMBEDDING_DIMENSIONS), dtype=np.float32)
+        return cls(ids, matrix, version)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def top_k(self, query, k: int) -> list:
+        if not self.ids or k <= 0:
+            return []
+
+        vector = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+
+        scores = self.matrix @ vector
+        k = min(k, len(self.ids))
+        if k < len(self.ids):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(self.ids))
+        order = candidates[np.argsort(-scores[candidates])]
+        return [(self.ids[i], float(scores[i])) for i in order]
+
+class VectorIndexCache:
+    def __init__(self, max_bytes: int, directory: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._indexes = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, workspace_id: str, version: str) -> Optional[WorkspaceVectorIndex]:
+        with self._lock:
+            index = self._indexes.get(workspace_id)
+            if index is not None and index.version == version:
+                self._indexes.move_to_end(workspace_id)
+                return index
+
+        index = self._load(workspace_id, version)
+        if index is not None:
+            self._put(workspace_id, index)
+        return index
+
+    def put(self, workspace_id: str, index: WorkspaceVectorIndex) -> None:
+        self._put(workspace_id, index)
+        self._save(workspace_id, index)
+
+    def invalidate(self, workspace_id: str) -> None:
+        workspace_id = str(workspace_id)
+        with self._lock:
+            index = self._indexes.pop(workspace_id, None)
+            if index is not None:
+                self._bytes -= index.nbytes
+        if self.directory:
+            for path in self._paths(workspace_id):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _put(self, workspace_id: str, index: WorkspaceVectorIndex) -> None:
+        with self._lock:
+            previous = self._indexes.pop(workspace_id, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._indexes[workspace_id] = index
+            self._bytes += index.nbytes
+            while self._bytes > self.max_bytes and len(self._indexes) > 1:
+                _, evicted = self._indexes.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def _paths(self, workspace_id: str) -> tuple:
+        return (
+            os.path.join(self.directory, f"{workspace_id}.npy"),
+            os.path.join(self.directory, f"{workspace_id}.json")
+        )
+
+    def _save(self, workspace_id: str, index: WorkspaceVectorIndex) -> None:
+        if not self.directory:
+            return
+        matrix_path, meta_path = self._paths(workspace_id)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write the matrix first; the metadata file marks the pair as complete.
+            tmp_matrix = matrix_path + ".tmp"
+            with open(tmp_matrix, "wb") as f:
+                np.save(f, index.matrix)
+            os.replace(tmp_matrix, matrix_path)
+            tmp_meta = meta_path + ".tmp"
+            with open(tmp_meta, "w") as f:
+                json.dump({"version": index.version, "ids": index.ids}, f)
+            os.replace(tmp_meta, meta_path)
+        except OSError:
+            logger.exception("Failed to persist vector index for workspace %s", workspace_id)
+
+    def _load(self, workspace_id: str, version: str) -> Optional[WorkspaceVectorIndex]:
+        if not self.directory:
+            return None
+        matrix_path, meta_path = self._paths(workspace_id)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta["version"] != version:
+                return None
+            matrix = np.load(matrix_path, mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+        if matrix.shape[0] != len(meta["ids"]):
+            return None
+        return WorkspaceVectorIndex(meta["ids"], matrix, version)
+
+vector_index_cache = VectorIndexCache(
+    max_bytes=settings.vector_index_cache_mb * 1024 * 1024,
+    directory=settings.vector_index_dir
+)
+
+def get_workspace_index(conn, workspace_id: str, version) -> WorkspaceVectorIndex:
+    key = version_key(version)
+    index = vector_index_cache.get(workspace_id, key)
+    if index is None:
+        rows = conn.execute(
+            text("""
+                SELECT p.id, p.embedding
+                FROM papers p
+                JOIN workspace_papers wp ON p.id = wp.paper_id
+                WHERE wp.workspace_id = :workspace_id
+                AND p.embedding IS NOT NULL AND p.embedding_model = :embedding_model
+            """),
+            {"workspace_id": workspace_id, "embedding_model": settings.embedding_model_name}
+        ).fetchall()
+        index = WorkspaceVectorIndex.from_rows(rows, key)
+        # While papers are being re-embedded the index is incomplete and the
+        # workspace version does not change, so only cache complete indexes.
+        if len(index.ids) == version[0]:
+            vector_index_cache.put(workspace_id, index)
+    return index
+
+def invalidate_workspace_index(workspace_id: str) -> None:
+    vector_index_cache.invalidate(workspace_id)
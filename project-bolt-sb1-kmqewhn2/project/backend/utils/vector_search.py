@@ -0,0 +1,63 @@
+from typing import Optional
+from sqlalchemy import text
+from config import get_settings
+from utils.vector_index import EMBEDDING_DIMENSIONS
+
+settings = get_settings()
+
+# Expressions must match the index definitions in the compact-index migration.
+SHORTLIST_DISTANCES = {
+    "half": f"CAST(p.embedding AS halfvec({EMBEDDING_DIMENSIONS})) <=> CAST({{query}} AS halfvec({EMBEDDING_DIMENSIONS}))",
+    "binary": f"CAST(binary_quantize(p.embedding) AS bit({EMBEDDING_DIMENSIONS})) <~> binary_quantize({{query}})"
+}
+
+HNSW_MAX_EF_SEARCH = 1000
+
+def nearest_papers_sql(query: str, limit: str, join: str = "", where: str = "", mode: Optional[str] = None) -> str:
+    # Returns (id, distance) rows for the papers nearest to the `query` vector
+    # expression, closest first. In the compact modes the quantized index
+    # shortlists `limit * :shortlist_factor` papers, which are then re-ranked
+    # with their full-precision embeddings.
+    mode = mode or settings.vector_search_mode
+    conditions = "p.embedding IS NOT NULL AND p.embedding_model = :embedding_model"
+    if where:
+        conditions += f" AND {where}"
+
+    if mode == "full":
+        return f"""
+            SELECT p.id, p.embedding <=> {query} AS distance
+            FROM papers p
+            {join}
+            WHERE {conditions}
+            ORDER BY distance
+            LIMIT {limit}
+        """
+
+    return f"""
+        SELECT shortlist.id, shortlist.embedding <=> {query} AS distance
+        FROM (
+            SELECT p.id, p.embedding
+            FROM papers p
+            {join}
+            WHERE {conditions}
+            ORDER BY {SHORTLIST_DISTANCES[mode].format(query=query)}
+            LIMIT {limit} * :shortlist_factor
+        ) shortlist
+        ORDER BY distance
+        LIMIT {limit}
+    """
+
+def vector_search_params() -> dict:
+    return {
+        "embedding_model": settings.embedding_model_name,
+        "shortlist_factor": settings.vector_shortlist_factor
+    }
+
+def prepare_vector_search(conn, limit: int, mode: Optional[str] = None) -> None:
+    # HNSW returns at most ef_search rows, so widen it for the shortlist; the
+    # setting is transaction-local.
+    mode = mode or settings.vector_search_mode
+    if mode == "full":
+        return
+    ef_search = min(max(limit * settings.vector_shortlist_factor, 40), HNSW_MAX_EF_SEARCH)
+    conn.execute(text("SELECT set_config('hnsw.ef_search', :ef_search, true)"), {"ef_search": str(ef_search)})
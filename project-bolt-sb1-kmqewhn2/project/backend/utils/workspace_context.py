@@ -0,0 +1,47 @@
+from sqlalchemy import text
+from config import get_settings
+from utils.ai import build_context_from_papers
+from utils.cache import LRUCache
+
+settings = get_settings()
+
+# Snapshots are keyed by workspace and tagged with the workspace_papers version
+# marker (count, max added_at), so a stale entry left by another worker is
+# rebuilt on the next read even without an explicit invalidation.
+context_cache = LRUCache(maxsize=settings.context_cache_size)
+
+def load_workspace_papers(conn, workspace_id: str) -> list:
+    result = conn.execute(
+        text("""
+            SELECT p.id, p.title, p.authors, left(p.abstract, 300) AS abstract
+            FROM papers p
+            JOIN workspace_papers wp ON p.id = wp.paper_id
+            WHERE wp.workspace_id = :workspace_id
+            ORDER BY wp.added_at
+        """),
+        {"workspace_id": workspace_id}
+    )
+    return [
+        {
+            "id": str(paper.id),
+            "title": paper.title,
+            "authors": paper.authors,
+            "abstract": paper.abstract
+        }
+        for paper in result
+    ]
+
+def get_workspace_snapshot(conn, workspace_id: str, version) -> dict:
+    snapshot = context_cache.get(workspace_id)
+    if snapshot is None or snapshot["version"] != version:
+        papers = load_workspace_papers(conn, workspace_id)
+        snapshot = {
+            "version": version,
+            "papers": papers,
+            "context": build_context_from_papers(papers)
+        }
+        context_cache.set(workspace_id, snapshot)
+    return snapshot
+
+def invalidate_workspace_context(workspace_id: str) -> None:
+    context_cache.pop(str(workspace_id))
@@ -0,0 +1,327 @@
+import uuid
+from typing import IO, Iterable, Iterator
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.exc import DataError, IntegrityError
+from config import get_settings
+from database import engine, read_connection
+from utils.vector_index import EMBEDDING_DIMENSIONS
+
+settings = get_settings()
+
+NDJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE
+
+def _record(kind: str, data: dict) -> bytes:
+    return orjson.dumps({"type": kind, "data": data}, option=NDJSON_OPTIONS)
+
+def iter_workspace_export(workspace_id: str) -> Iterator[bytes]:
+    # Server-side cursors keep memory flat however large the workspace is;
+    # embeddings are passed through as their text form without parsing.
+    with read_connection() as conn:
+        conn = conn.execution_options(stream_results=True, yield_per=settings.export_batch_size)
+        params = {"workspace_id": workspace_id}
+
+        workspace = conn.execute(
+            text("SELECT name, description, created_at, updated_at FROM workspaces WHERE id = :workspace_id"),
+            params
+        ).first()
+        yield _record("workspace", dict(workspace._mapping))
+
+        papers = conn.execute(
+            text("""
+                SELECT p.id, p.title, p.authors, p.abstract, p.publication_date, p.pdf_url, p.arxiv_id, p.doi,
+                       p.content_hash, p.summary, p.summarized_at, p.created_at,
+                       CAST(p.embedding AS text) AS embedding, p.embedding_model, t.pdf_text, wp.added_at
+                FROM workspace_papers wp
+                JOIN papers p ON p.id = wp.paper_id
+                LEFT JOIN paper_texts t ON t.paper_id = p.id
+                WHERE wp.workspace_id = :workspace_id
+                ORDER BY wp.added_at
+            """),
+            params
+        )
+        for row in papers:
+            data = dict(row._mapping)
+            if data["embedding"] is not None:
+                data["embedding"] = orjson.Fragment(data["embedding"])
+            yield _record("paper", data)
+
+        conversations = conn.execute(
+            text("""
+                SELECT id, title, created_at, updated_at
+                FROM conversations
+                WHERE workspace_id = :workspace_id
+                ORDER BY created_at
+            """),
+            params
+        )
+        for row in conversations:
+            yield _record("conversation", dict(row._mapping))
+
+        messages = conn.execute(
+            text("""
+                SELECT m.conversation_id, m.role, m.content, m.created_at
+                FROM messages_with_archive m
+                JOIN conversations c ON c.id = m.conversation_id
+                WHERE c.workspace_id = :workspace_id
+                ORDER BY m.conversation_id, m.created_at
+            """),
+            params
+        )
+        for row in messages:
+            yield _record("message", dict(row._mapping))
+
+def iter_ndjson(lines: Iterable[bytes]) -> Iterator[dict]:
+    for line in lines:
+        if line.strip():
+            yield _parse_line(line)
+
+def _invalid(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+def _check_paper(row: dict) -> None:
+    if row.get("id") is not None:
+        try:
+            uuid.UUID(str(row["id"]))
+        except ValueError:
+            raise _invalid(f"Paper id is not a UUID: {row['id']!r}")
+    embedding = row.get("embedding")
+    if embedding is not None and (
+        not isinstance(embedding, list) or len(embedding) != EMBEDDING_DIMENSIONS
+        or not all(isinstance(x, (int, float)) for x in embedding)
+    ):
+        raise _invalid(f"Paper embeddings must be lists of {EMBEDDING_DIMENSIONS} numbers")
+
+def _check_message(row: dict) -> None:
+    if row.get("role") not in ("user", "assistant"):
+        raise _invalid(f"Message role must be user or assistant, not {row.get('role')!r}")
+    if not isinstance(row.get("content"), str):
+        raise _invalid("Message content must be a string")
+
+def _parse_line(line: bytes) -> dict:
+    try:
+        record = orjson.loads(line)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Import contains invalid JSON")
+    if not isinstance(record, dict) or not isinstance(record.get("data"), dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Import records need a type and data")
+    return record
+
+class WorkspaceImporter:
+    # Loads an export into a new workspace owned by the importing user, one
+    # jsonb_to_recordset statement per batch. Papers resolve to an existing
+    # copy by id, arXiv id or content hash, otherwise they are stored as new
+    # papers with fresh ids and their embeddings; conversations get fresh ids
+    # so a workspace can be imported more than once.
+    def __init__(self, conn, user_id: str):
+        self.conn = conn
+        self.user_id = user_id
+        self.workspace = None
+        self.conversation_ids = {}
+        self.inserted_paper_ids = []
+        self.pending = {"paper": [], "conversation": [], "message": []}
+        self.counts = {"paper": 0, "conversation": 0, "message": 0}
+
+    def add(self, record: dict) -> None:
+        kind, data = record.get("type"), record["data"]
+        if kind == "workspace":
+            if self.workspace is not None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Import contains more than one workspace")
+            self._create_workspace(data)
+            return
+
+        if kind not in self.pending:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown import record type: {kind}")
+        if self.workspace is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Import must start with a workspace record")
+
+        if kind == "paper":
+            _check_paper(data)
+        elif kind == "message":
+            _check_message(data)
+        self.pending[kind].append(data)
+        if len(self.pending[kind]) >= settings.import_batch_size:
+            self.flush(kind)
+
+    def finish(self) -> None:
+        if self.workspace is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Import must start with a workspace record")
+        for kind in self.pending:
+            self.flush(kind)
+
+    def flush(self, kind: str) -> None:
+        if kind == "message":
+            # Messages reference conversations, which must be written first.
+            self.flush("conversation")
+        rows = self.pending[kind]
+        if not rows:
+            return
+        self.pending[kind] = []
+        getattr(self, f"_insert_{kind}s")(rows)
+        self.counts[kind] += len(rows)
+
+    def _create_workspace(self, data: dict) -> None:
+        self.workspace = self.conn.execute(
+            text("""
+                INSERT INTO workspaces (user_id, name, description, created_at, updated_at)
+                VALUES (:user_id, :name, :description, now(), now())
+                RETURNING id, user_id, name, description, created_at, updated_at
+            """),
+            {
+                "user_id": self.user_id,
+                "name": data.get("name") or "Imported workspace",
+                "description": data.get("description") or ""
+            }
+        ).fetchone()
+
+    def _insert_papers(self, rows: list) -> None:
+        # Papers already stored (same id, arXiv id or content hash) are linked.
+        # The rest get fresh ids but keep their arXiv id and content hash, so
+        # the round trip is lossless and later imports and uploads of the same
+        # paper deduplicate against them.
+        matches = self.conn.execute(
+            text("""
+                SELECT r.ord, m.id
+                FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(
+                    ord int, id uuid, arxiv_id text, content_hash text
+                )
+                CROSS JOIN LATERAL (
+                    SELECT p.id
+                    FROM papers p
+                    WHERE p.id = r.id OR p.arxiv_id = r.arxiv_id OR p.content_hash = r.content_hash
+                    ORDER BY p.id = r.id DESC
+                    LIMIT 1
+                ) m
+            """),
+            {"rows": orjson.dumps([
+                {"ord": ord, **{key: row.get(key) for key in ("id", "arxiv_id", "content_hash")}}
+                for ord, row in enumerate(rows)
+            ]).decode()}
+        ).fetchall()
+        paper_ids = {row.ord: str(row.id) for row in matches}
+
+        # Rows of this batch sharing an arXiv id or content hash become one paper.
+        new_rows = []
+        new_ids = {}
+        for ord, row in enumerate(rows):
+            if ord in paper_ids:
+                continue
+            keys = [(key, row[key]) for key in ("arxiv_id", "content_hash") if row.get(key)]
+            paper_id = next((new_ids[key] for key in keys if key in new_ids), None)
+            if paper_id is None:
+                paper_id = str(uuid.uuid4())
+                new_rows.append({**row, "id": paper_id})
+            for key in keys:
+                new_ids.setdefault(key, paper_id)
+            paper_ids[ord] = paper_id
+
+        if new_rows:
+            # Exports made before embedding models were tracked only hold the original model's vectors.
+            self.conn.execute(
+                text("""
+                    INSERT INTO papers (id, title, authors, abstract, publication_date, pdf_url, arxiv_id, doi,
+                                        content_hash, summary, summarized_at, embedding, embedding_model, created_at)
+                    SELECT r.id, r.title, COALESCE(r.authors, '{}'), COALESCE(r.abstract, ''), r.publication_date,
+                           r.pdf_url, r.arxiv_id, r.doi, r.content_hash, r.summary, r.summarized_at,
+                           CAST(CAST(r.embedding AS text) AS vector),
+                           CASE WHEN r.embedding IS NOT NULL THEN COALESCE(r.embedding_model, 'all-MiniLM-L6-v2') END,
+                           COALESCE(r.created_at, now())
+                    FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(
+                        id uuid, title text, authors text[], abstract text, publication_date date, pdf_url text,
+                        arxiv_id text, doi text, content_hash text, summary text, summarized_at timestamptz,
+                        embedding jsonb, embedding_model text, created_at timestamptz
+                    )
+                """),
+                {"rows": orjson.dumps([
+                    {k: v for k, v in row.items() if k != "pdf_text"}
+                    for row in new_rows
+                ]).decode()}
+            )
+            self.inserted_paper_ids.extend(row["id"] for row in new_rows)
+
+            texts = [{"paper_id": row["id"], "pdf_text": row["pdf_text"]} for row in new_rows if row.get("pdf_text")]
+            if texts:
+                self.conn.execute(
+                    text("""
+                        INSERT INTO paper_texts (paper_id, pdf_text)
+                        SELECT r.paper_id, r.pdf_text
+                        FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(paper_id uuid, pdf_text text)
+                    """),
+                    {"rows": orjson.dumps(texts).decode()}
+                )
+
+        links = [{"paper_id": paper_ids[ord], "added_at": row.get("added_at")} for ord, row in enumerate(rows)]
+        self.conn.execute(
+            text("""
+                INSERT INTO workspace_papers (workspace_id, paper_id, added_at)
+                SELECT CAST(:workspace_id AS uuid), r.paper_id, COALESCE(r.added_at, now())
+                FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(paper_id uuid, added_at timestamptz)
+                ON CONFLICT (workspace_id, paper_id) DO NOTHING
+            """),
+            {"workspace_id": str(self.workspace.id), "rows": orjson.dumps(links).decode()}
+        )
+
+    def _insert_conversations(self, rows: list) -> None:
+        for row in rows:
+            new_id = str(uuid.uuid4())
+            if row.get("id"):
+                self.conversation_ids[row["id"]] = new_id
+            row["id"] = new_id
+
+        self.conn.execute(
+            text("""
+                INSERT INTO conversations (id, workspace_id, title, created_at, updated_at)
+                SELECT r.id, CAST(:workspace_id AS uuid), COALESCE(r.title, 'Imported conversation'),
+                       COALESCE(r.created_at, now()), COALESCE(r.updated_at, now())
+                FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(
+                    id uuid, title text, created_at timestamptz, updated_at timestamptz
+                )
+            """),
+            {"workspace_id": str(self.workspace.id), "rows": orjson.dumps(rows).decode()}
+        )
+
+    def _insert_messages(self, rows: list) -> None:
+        for row in rows:
+            conversation_id = self.conversation_ids.get(row.get("conversation_id"))
+            if conversation_id is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Message references a conversation that is not in the import"
+                )
+            row["conversation_id"] = conversation_id
+
+        # Messages is partitioned by month; old conversations need their months
+        # to exist, and so does the current one for messages without a date.
+        earliest = min((row["created_at"] for row in rows if row.get("created_at")), default=None)
+        self.conn.execute(
+            text("SELECT create_messages_partitions(0, CAST(CAST(:earliest AS timestamptz) AS date))"),
+            {"earliest": earliest}
+        )
+
+        self.conn.execute(
+            text("""
+                INSERT INTO messages (conversation_id, role, content, created_at)
+                SELECT r.conversation_id, r.role, r.content, COALESCE(r.created_at, now())
+                FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(
+                    conversation_id uuid, role text, content text, created_at timestamptz
+                )
+            """),
+            {"rows": orjson.dumps(rows).decode()}
+        )
+
+def import_workspace_file(body: IO[bytes], user_id: str) -> WorkspaceImporter:
+    # Runs on a fully buffered body, so the connection and its transaction are
+    # only held for the database work; a bad line leaves nothing half-imported.
+    with engine.connect() as conn:
+        importer = WorkspaceImporter(conn, user_id)
+        try:
+            for record in iter_ndjson(body):
+                importer.add(record)
+            importer.finish()
+        except (DataError, IntegrityError) as e:
+            # Values Postgres rejects (bad dates, duplicate keys, ...) are the
+            # file's fault; the transaction is rolled back when conn closes.
+            raise _invalid(f"Import contains invalid data: {e.orig}")
+        conn.commit()
+    return importer
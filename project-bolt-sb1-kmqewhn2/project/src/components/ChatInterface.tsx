@@ -9,7 +9,7 @@ interface Message {
   created_at: string;
 }
 
-interface Conversation {
+export interface Conversation {
   id: string;
   title: string;
   created_at: string;
@@ -18,11 +18,14 @@ interface Conversation {
 
 interface Props {
   workspaceId: string;
+  initialConversations?: Conversation[];
 }
 
-export default function ChatInterface({ workspaceId }: Props) {
-  const [conversations, setConversations] = useState<Conversation[]>([]);
-  const [currentConversation, setCurrentConversation] = useState<string | null>(null);
+export default function ChatInterface({ workspaceId, initialConversations }: Props) {
+  const [conversations, setConversations] = useState<Conversation[]>(initialConversations ?? []);
+  const [currentConversation, setCurrentConversation] = useState<string | null>(
+    initialConversations?.[0]?.id ?? null
+  );
   const [messages, setMessages] = useState<Message[]>([]);
   const [inputMessage, setInputMessage] = useState('');
   const [loading, setLoading] = useState(false);
@@ -31,7 +34,10 @@ export default function ChatInterface({ workspaceId }: Props) {
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   useEffect(() => {
-    loadConversations();
+    // The workspace page already fetched the recent conversations with its overview.
+    if (!initialConversations) {
+      loadConversations();
+    }
   }, [workspaceId]);
 
   useEffect(() => {
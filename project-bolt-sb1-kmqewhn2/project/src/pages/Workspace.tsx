@@ -3,7 +3,7 @@ import { useParams, useNavigate } from 'react-router-dom';
 import { ArrowLeft, Search, MessageSquare, FileText, X } from 'lucide-react';
 import { workspaceApi, paperApi } from '../services/api';
 import PaperSearch from '../components/PaperSearch';
-import ChatInterface from '../components/ChatInterface';
+import ChatInterface, { Conversation } from '../components/ChatInterface';
 
 interface Workspace {
   id: string;
@@ -27,6 +27,7 @@ export default function Workspace() {
 
   const [workspace, setWorkspace] = useState<Workspace | null>(null);
   const [papers, setPapers] = useState<Paper[]>([]);
+  const [conversations, setConversations] = useState<Conversation[] | undefined>(undefined);
   const [activeTab, setActiveTab] = useState<'papers' | 'chat'>('papers');
   const [showSearchModal, setShowSearchModal] = useState(false);
   const [loading, setLoading] = useState(true);
@@ -34,14 +35,21 @@ export default function Workspace() {
   useEffect(() => {
     if (id) {
       loadWorkspace();
-      loadPapers();
     }
   }, [id]);
 
   const loadWorkspace = async () => {
     try {
-      const data: any = await workspaceApi.getById(id!);
-      setWorkspace(data);
+      const data: any = await workspaceApi.getOverview(id!);
+      setWorkspace(data.workspace);
+      setPapers(data.papers);
+      // The overview holds the first page only; larger workspaces load the rest separately.
+      if (data.paper_count > data.papers.length) {
+        loadPapers();
+      }
+      if (data.conversation_count <= data.conversations.length) {
+        setConversations(data.conversations);
+      }
     } catch (error) {
       console.error('Failed to load workspace:', error);
       navigate('/dashboard');
@@ -102,7 +110,11 @@ export default function Workspace() {
       <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-6">
         <div className="flex gap-2 mb-6">
           <button
-            onClick={() => setActiveTab('papers')}
+            onClick={() => {
+              setActiveTab('papers');
+              // Conversations may have changed while chatting; reload them next time.
+              setConversations(undefined);
+            }}
             className={`flex items-center gap-2 px-4 py-2 rounded-lg font-medium transition-colors ${
               activeTab === 'papers'
                 ? 'bg-indigo-600 text-white'
@@ -201,7 +213,7 @@ export default function Workspace() {
             )}
           </div>
         ) : (
-          <ChatInterface workspaceId={id!} />
+          <ChatInterface workspaceId={id!} initialConversations={conversations} />
         )}
       </div>
 
@@ -72,6 +72,12 @@ export const workspaceApi = {
       requiresAuth: true,
     }),
 
+  getOverview: (id: string) =>
+    apiRequest(`/workspaces/${id}/overview`, {
+      method: 'GET',
+      requiresAuth: true,
+    }),
+
   update: (id: string, data: { name?: string; description?: string }) =>
     apiRequest(`/workspaces/${id}`, {
       method: 'PUT',
@@ -0,0 +1,24 @@
+/*
+  # Full-text search over papers
+
+  1. Changes
+    - `papers`
+      - `search_vector` (tsvector, generated from title, abstract and pdf_text)
+
+  2. Indexes
+    - GIN index on `papers.search_vector` for keyword and hybrid search
+
+  3. Notes
+    - Title is weighted highest, then abstract, then the extracted PDF text
+    - PDF text is truncated before indexing to stay within the tsvector size limit
+*/
+
+ALTER TABLE papers
+  ADD COLUMN IF NOT EXISTS search_vector tsvector
+  GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(abstract, '')), 'B') ||
+    setweight(to_tsvector('english', left(coalesce(pdf_text, ''), 200000)), 'C')
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS papers_search_vector_idx ON papers USING gin (search_vector);
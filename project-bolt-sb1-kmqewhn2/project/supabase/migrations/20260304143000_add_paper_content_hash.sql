@@ -0,0 +1,17 @@
+/*
+  # Content-addressed deduplication of uploaded PDFs
+
+  1. Changes
+    - `papers`
+      - `content_hash` (text, SHA-256 hex digest of the original PDF bytes)
+
+  2. Indexes
+    - Unique partial index on `papers.content_hash` so the same file is only stored once
+
+  3. Notes
+    - Existing rows are backfilled with `python -m scripts.backfill_content_hashes`
+*/
+
+ALTER TABLE papers ADD COLUMN IF NOT EXISTS content_hash text;
+
+CREATE UNIQUE INDEX IF NOT EXISTS papers_content_hash_key ON papers(content_hash) WHERE content_hash IS NOT NULL;
@@ -0,0 +1,104 @@
+/*
+  # Move extracted PDF text out of `papers`
+
+  1. New Tables
+    - `paper_texts`
+      - `paper_id` (uuid, primary key, foreign key to papers)
+      - `pdf_text` (text, lz4-compressed)
+      - `created_at` (timestamptz)
+
+  2. Changes
+    - Existing `papers.pdf_text` values are copied into `paper_texts` and the column is dropped
+    - `papers.search_vector` can no longer be a generated column (it reads `paper_texts`),
+      so it becomes a regular column maintained by triggers on `papers` and `paper_texts`
+
+  3. Security
+    - Enable RLS on `paper_texts` with the same policies as `papers`
+
+  4. Notes
+    - Column compression requires PostgreSQL 14+ built with lz4
+*/
+
+CREATE TABLE IF NOT EXISTS paper_texts (
+  paper_id uuid PRIMARY KEY REFERENCES papers(id) ON DELETE CASCADE,
+  pdf_text text NOT NULL,
+  created_at timestamptz DEFAULT now()
+);
+
+ALTER TABLE paper_texts ALTER COLUMN pdf_text SET COMPRESSION lz4;
+
+ALTER TABLE paper_texts ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Authenticated users can view paper texts"
+  ON paper_texts FOR SELECT
+  TO authenticated
+  USING (true);
+
+CREATE POLICY "Authenticated users can create paper texts"
+  ON paper_texts FOR INSERT
+  TO authenticated
+  WITH CHECK (true);
+
+INSERT INTO paper_texts (paper_id, pdf_text, created_at)
+SELECT id, pdf_text, created_at FROM papers
+WHERE pdf_text IS NOT NULL
+ON CONFLICT (paper_id) DO NOTHING;
+
+-- Rebuild search_vector as a trigger-maintained column
+CREATE OR REPLACE FUNCTION paper_search_vector(p_title text, p_abstract text, p_pdf_text text)
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE
+AS $$
+  SELECT setweight(to_tsvector('english', coalesce(p_title, '')), 'A') ||
+         setweight(to_tsvector('english', coalesce(p_abstract, '')), 'B') ||
+         setweight(to_tsvector('english', left(coalesce(p_pdf_text, ''), 200000)), 'C')
+$$;
+
+DROP INDEX IF EXISTS papers_search_vector_idx;
+ALTER TABLE papers DROP COLUMN IF EXISTS search_vector;
+ALTER TABLE papers ADD COLUMN search_vector tsvector;
+
+UPDATE papers p
+SET search_vector = paper_search_vector(
+  p.title,
+  p.abstract,
+  (SELECT t.pdf_text FROM paper_texts t WHERE t.paper_id = p.id)
+);
+
+CREATE OR REPLACE FUNCTION papers_refresh_search_vector()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.search_vector := paper_search_vector(
+    NEW.title,
+    NEW.abstract,
+    (SELECT pdf_text FROM paper_texts WHERE paper_id = NEW.id)
+  );
+  RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER papers_search_vector_trigger
+  BEFORE INSERT OR UPDATE OF title, abstract ON papers
+  FOR EACH ROW EXECUTE FUNCTION papers_refresh_search_vector();
+
+CREATE OR REPLACE FUNCTION paper_texts_refresh_search_vector()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  UPDATE papers
+  SET search_vector = paper_search_vector(title, abstract, NEW.pdf_text)
+  WHERE id = NEW.paper_id;
+  RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER paper_texts_search_vector_trigger
+  AFTER INSERT OR UPDATE OF pdf_text ON paper_texts
+  FOR EACH ROW EXECUTE FUNCTION paper_texts_refresh_search_vector();
+
+CREATE INDEX IF NOT EXISTS papers_search_vector_idx ON papers USING gin (search_vector);
+
+ALTER TABLE papers DROP COLUMN IF EXISTS pdf_text;
@@ -0,0 +1,15 @@
+/*
+  # Precomputed paper summaries
+
+  1. Changes
+    - `papers`
+      - `summary` (text, LLM-generated summary written in the background at ingest)
+      - `summarized_at` (timestamptz)
+
+  2. Notes
+    - Summaries feed the map-reduce chat mode so multi-paper questions do not
+      need every paper's full text in a single prompt
+*/
+
+ALTER TABLE papers ADD COLUMN IF NOT EXISTS summary text;
+ALTER TABLE papers ADD COLUMN IF NOT EXISTS summarized_at timestamptz;
@@ -0,0 +1,37 @@
+/*
+  # Precomputed related-paper lists
+
+  1. New Tables
+    - `paper_neighbors`
+      - `paper_id` (uuid, foreign key to papers)
+      - `neighbor_id` (uuid, foreign key to papers)
+      - `similarity` (real, cosine similarity of the two embeddings)
+      - primary key (`paper_id`, `neighbor_id`)
+
+  2. Indexes
+    - (`paper_id`, `similarity` DESC) so a paper's related list is one index range scan
+
+  3. Security
+    - Enable RLS on `paper_neighbors`; readable by authenticated users like `papers`
+
+  4. Notes
+    - Each paper keeps its top-k neighbours; lists are updated incrementally when
+      papers are ingested and can be rebuilt with `python -m scripts.rebuild_neighbors`
+*/
+
+CREATE TABLE IF NOT EXISTS paper_neighbors (
+  paper_id uuid NOT NULL REFERENCES papers(id) ON DELETE CASCADE,
+  neighbor_id uuid NOT NULL REFERENCES papers(id) ON DELETE CASCADE,
+  similarity real NOT NULL,
+  PRIMARY KEY (paper_id, neighbor_id)
+);
+
+ALTER TABLE paper_neighbors ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Authenticated users can view paper neighbors"
+  ON paper_neighbors FOR SELECT
+  TO authenticated
+  USING (true);
+
+CREATE INDEX IF NOT EXISTS idx_paper_neighbors_paper_similarity ON paper_neighbors(paper_id, similarity DESC);
+CREATE INDEX IF NOT EXISTS idx_paper_neighbors_neighbor_id ON paper_neighbors(neighbor_id);
@@ -0,0 +1,13 @@
+/*
+  # arXiv id indexes
+
+  1. Indexes
+    - Unique partial index on `papers.arxiv_id`, the conflict target used when
+      upserting papers fetched from arXiv
+    - Expression index on the version-less arXiv id, used to skip papers that
+      are already stored (in any version) during bulk imports
+*/
+
+CREATE UNIQUE INDEX IF NOT EXISTS papers_arxiv_id_key ON papers(arxiv_id) WHERE arxiv_id IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_papers_arxiv_base_id ON papers ((regexp_replace(arxiv_id, 'v[0-9]+$', '')));
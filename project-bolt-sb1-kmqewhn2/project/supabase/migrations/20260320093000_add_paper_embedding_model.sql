@@ -0,0 +1,40 @@
+/*
+  # Track which model produced each paper embedding
+
+  1. Changes
+    - `papers`
+      - `embedding_model` (text, name of the sentence-transformers model behind `embedding`)
+
+  2. New Tables
+    - `embedding_checkpoints`
+      - `model` (text, primary key)
+      - `last_paper_id` (uuid, keyset position of the re-embedding run)
+      - `processed` (bigint)
+      - `updated_at` (timestamptz)
+
+  3. Security
+    - Enable RLS on `embedding_checkpoints` with no policies; only the
+      service connection used by `scripts.reembed_papers` touches it
+
+  4. Notes
+    - Every existing embedding was produced by `all-MiniLM-L6-v2`
+    - Search, related papers and the vector index only use embeddings of the
+      model named by EMBEDDING_MODEL_NAME, so vector spaces are never mixed
+      while `python -m scripts.reembed_papers` migrates the corpus
+    - `embedding` stays `vector(384)`; a model with another dimension needs
+      its own column
+*/
+
+ALTER TABLE papers ADD COLUMN IF NOT EXISTS embedding_model text;
+
+UPDATE papers SET embedding_model = 'all-MiniLM-L6-v2'
+WHERE embedding IS NOT NULL AND embedding_model IS NULL;
+
+CREATE TABLE IF NOT EXISTS embedding_checkpoints (
+  model text PRIMARY KEY,
+  last_paper_id uuid,
+  processed bigint NOT NULL DEFAULT 0,
+  updated_at timestamptz DEFAULT now()
+);
+
+ALTER TABLE embedding_checkpoints ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,28 @@
+/*
+  # Compact embedding indexes for two-stage vector search
+
+  1. Indexes
+    - HNSW index on `embedding` cast to `halfvec(384)` (half the size of the float32 index)
+    - HNSW index on `binary_quantize(embedding)` as `bit(384)` (1/32 of the size)
+
+  2. Notes
+    - Expression indexes rather than extra columns: the heap keeps a single
+      full-precision copy, which the second stage reads to re-rank the shortlist
+    - Used when VECTOR_SEARCH_MODE is `half` or `binary`; the default `full`
+      keeps using `papers_embedding_idx`
+    - Requires pgvector 0.7.0+; on older versions the indexes are skipped and
+      only the `full` mode is available
+*/
+
+DO $$
+BEGIN
+  IF (SELECT string_to_array(extversion, '.')::int[] >= ARRAY[0, 7, 0] FROM pg_extension WHERE extname = 'vector') THEN
+    CREATE INDEX IF NOT EXISTS papers_embedding_half_idx
+      ON papers USING hnsw ((embedding::halfvec(384)) halfvec_cosine_ops);
+    CREATE INDEX IF NOT EXISTS papers_embedding_bit_idx
+      ON papers USING hnsw ((binary_quantize(embedding)::bit(384)) bit_hamming_ops);
+  ELSE
+    RAISE NOTICE 'pgvector 0.7.0+ is required for halfvec/bit indexes; skipping';
+  END IF;
+END;
+$$;
@@ -0,0 +1,140 @@
+/*
+  # Partition `messages` by month
+
+  1. Changes
+    - `messages` becomes a table range-partitioned on `created_at`, one
+      partition per month (`messages_pYYYYMM`); existing rows are copied over
+    - Primary key is now (`id`, `created_at`), as the partition key must be
+      part of it; `created_at` is NOT NULL
+    - `create_messages_partitions(months_ahead, from_month)` creates the
+      partitions from `from_month` (default: the current month) up to
+      `months_ahead` months ahead; it is idempotent
+
+  2. New Tables
+    - `messages_archive.messages`, partitioned the same way, holding months
+      detached from `messages` by `python -m scripts.archive_messages`
+      (content rewritten with lz4 and a low `toast_tuple_target`)
+
+  3. New Views
+    - `messages_with_archive`, live and archived messages together
+      (`security_invoker`, so callers' RLS applies; PostgreSQL 15+)
+
+  4. Indexes
+    - (`conversation_id`, `created_at`) on both parents, so every partition
+      serves history reads with an index range scan; replaces
+      `idx_messages_conversation_id`
+
+  5. Security
+    - RLS and the existing policies are recreated on `messages`; partitions
+      and archive tables have RLS enabled with no policies, so they are only
+      reachable through the parents
+
+  6. Notes
+    - Inserts fail for months without a partition. The function runs daily
+      via pg_cron when the extension is installed; otherwise the archive
+      script also runs it, or schedule `SELECT create_messages_partitions(3)`
+      elsewhere
+*/
+
+CREATE OR REPLACE FUNCTION create_messages_partitions(months_ahead int DEFAULT 3, from_month date DEFAULT NULL)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  month_start date := date_trunc('month', COALESCE(from_month, now()::date));
+  last_month date := date_trunc('month', now()::date) + make_interval(months => months_ahead);
+  partition_name text;
+BEGIN
+  WHILE month_start <= last_month LOOP
+    partition_name := format('messages_p%s', to_char(month_start, 'YYYYMM'));
+    IF to_regclass(format('public.%I', partition_name)) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE public.%I PARTITION OF public.messages FOR VALUES FROM (%L) TO (%L)',
+        partition_name, month_start, month_start + interval '1 month'
+      );
+      EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', partition_name);
+    END IF;
+    month_start := month_start + interval '1 month';
+  END LOOP;
+END;
+$$;
+
+ALTER TABLE messages RENAME TO messages_unpartitioned;
+ALTER INDEX IF EXISTS idx_messages_conversation_id RENAME TO idx_messages_unpartitioned_conversation_id;
+
+CREATE TABLE messages (
+  id uuid NOT NULL DEFAULT gen_random_uuid(),
+  conversation_id uuid NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+  role text NOT NULL CHECK (role IN ('user', 'assistant')),
+  content text NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created ON messages(conversation_id, created_at);
+
+SELECT create_messages_partitions(
+  3,
+  (SELECT min(created_at)::date FROM messages_unpartitioned)
+);
+
+INSERT INTO messages (id, conversation_id, role, content, created_at)
+SELECT id, conversation_id, role, content, COALESCE(created_at, now())
+FROM messages_unpartitioned;
+
+DROP TABLE messages_unpartitioned;
+
+ALTER TABLE messages ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view messages in own conversations"
+  ON messages FOR SELECT
+  TO authenticated
+  USING (
+    EXISTS (
+      SELECT 1 FROM conversations
+      JOIN workspaces ON workspaces.id = conversations.workspace_id
+      WHERE conversations.id = messages.conversation_id
+      AND workspaces.user_id = auth.uid()
+    )
+  );
+
+CREATE POLICY "Users can create messages in own conversations"
+  ON messages FOR INSERT
+  TO authenticated
+  WITH CHECK (
+    EXISTS (
+      SELECT 1 FROM conversations
+      JOIN workspaces ON workspaces.id = conversations.workspace_id
+      WHERE conversations.id = messages.conversation_id
+      AND workspaces.user_id = auth.uid()
+    )
+  );
+
+CREATE SCHEMA IF NOT EXISTS messages_archive;
+
+CREATE TABLE IF NOT EXISTS messages_archive.messages (
+  id uuid NOT NULL,
+  conversation_id uuid NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+  role text NOT NULL,
+  content text NOT NULL,
+  created_at timestamptz NOT NULL,
+  PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_archived_messages_conversation_created
+  ON messages_archive.messages(conversation_id, created_at);
+
+ALTER TABLE messages_archive.messages ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE VIEW messages_with_archive WITH (security_invoker = true) AS
+  SELECT id, conversation_id, role, content, created_at FROM messages
+  UNION ALL
+  SELECT id, conversation_id, role, content, created_at FROM messages_archive.messages;
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.schedule('create-messages-partitions', '15 3 * * *', 'SELECT create_messages_partitions(3)');
+  END IF;
+END;
+$$;
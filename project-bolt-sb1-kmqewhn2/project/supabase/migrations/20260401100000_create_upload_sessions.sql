@@ -0,0 +1,41 @@
+/*
+  # Resumable upload sessions
+
+  1. New Tables
+    - `upload_sessions`
+      - `id` (uuid, primary key, also names the `<id>.part` file in UPLOAD_DIR)
+      - `user_id` (uuid, references users)
+      - `filename` (text)
+      - `title` (text)
+      - `authors` (text array)
+      - `size` (bigint, declared file size in bytes)
+      - `sha256` (text, declared hex digest, checked when the upload completes)
+      - `created_at` (timestamptz)
+      - `expires_at` (timestamptz)
+
+  2. Security
+    - Enable RLS on `upload_sessions` with no policies; only the API touches it
+
+  3. Notes
+    - The received bytes live on disk, not here; the size of the part file
+      is the resume offset, so a chunk that was cut off midway still counts
+      for whatever reached the disk
+    - Expired sessions and their part files are removed when new uploads start
+*/
+
+CREATE TABLE IF NOT EXISTS upload_sessions (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  user_id uuid NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  filename text NOT NULL,
+  title text NOT NULL DEFAULT '',
+  authors text[] NOT NULL DEFAULT '{}',
+  size bigint NOT NULL CHECK (size > 0),
+  sha256 text NOT NULL,
+  created_at timestamptz DEFAULT now(),
+  expires_at timestamptz NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_user_id ON upload_sessions(user_id);
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_expires_at ON upload_sessions(expires_at);
+
+ALTER TABLE upload_sessions ENABLE ROW LEVEL SECURITY;